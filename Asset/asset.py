@@ -1,9 +1,16 @@
 """
 This module contains the basic Asset Class
 """
+import numpy as np
 
 
 class Asset(object):
+    __slots__ = ('_initial_value',)
+    table_periods = 362  # periods covered by a new depreciation factor table (max term + 2), grown on demand
+    _factor_tables = {}  # monthly depreciation rate -> read-only array of (1 - rate) ** t for t = 0, 1, ...
+    _class_depreciation = {}  # asset class -> monthly depreciation rate
+    _class_factors = {}  # asset class -> its factor table as a list, for fast scalar lookups
+
     def __init__(self, initial_value):
         self._initial_value = initial_value
 
@@ -23,7 +30,50 @@ class Asset(object):
         """Returns the monthly depreciation rate for given annual depreciation rate"""
         return self.yearly_depreciation() / 12
 
+    @staticmethod
+    def depreciation_factors(monthly_depreciation, periods):
+        """
+        Returns the table of (1 - monthly_depreciation) ** t covering at least t = 0 to periods. Tables are
+        computed once per depreciation rate and shared by every asset with that rate.
+        """
+        table = Asset._factor_tables.get(monthly_depreciation)
+        if table is None or len(table) <= periods:
+            size = max(Asset.table_periods, periods + 1, 2 * len(table) if table is not None else 0)
+            table = (1 - monthly_depreciation) ** np.arange(size)
+            table.setflags(write=False)
+            Asset._factor_tables[monthly_depreciation] = table
+        return table
+
+    @classmethod
+    def class_depreciation(cls):
+        """Returns the monthly depreciation rate of the asset class, looked up once per class"""
+        rate = Asset._class_depreciation.get(cls)
+        if rate is None:
+            rate = Asset._class_depreciation[cls] = cls(0).monthly_depreciation()
+            Asset._class_factors[cls] = Asset.depreciation_factors(rate, 0).tolist()
+        return rate
+
     def value(self, t):
-        """Calculates the current value of the asset for a given period t"""
-        return self._initial_value * (1 - self.monthly_depreciation()) ** t
+        """Calculates the current value of the asset for a given period t, or an array of periods"""
+        factors = Asset._class_factors.get(type(self))
+        if factors is not None and type(t) is int and 0 <= t < len(factors):
+            return self._initial_value * factors[t]
+        t = np.asarray(t)
+        if t.dtype.kind not in 'iu' or t.min(initial=0) < 0:
+            return self._initial_value * (1 - self.monthly_depreciation()) ** t
+        return self._initial_value * self.depreciation_factors(self.class_depreciation(), int(t.max(initial=0)))[t]
+
+    @staticmethod
+    def values(initial_values, monthly_depreciation, t):
+        """
+        Calculates the values of a batch of assets with the given initial values and monthly depreciation
+        rates at periods t, broadcasting t against the assets (e.g. a (period x 1) column for a period x asset
+        matrix) using the shared depreciation factor tables
+        """
+        t = np.asarray(t)
+        rates, inverse = np.unique(monthly_depreciation, return_inverse=True)
+        horizon = int(t.max(initial=0))
+        tables = np.array([Asset.depreciation_factors(rate, horizon)[:horizon + 1] for rate in rates]).reshape(
+            len(rates), horizon + 1)
+        return np.asarray(initial_values) * tables[inverse.reshape(np.shape(monthly_depreciation)), t]
 
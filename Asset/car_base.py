@@ -4,6 +4,8 @@ from Asset.asset import Asset
 
 
 class Car(Asset):
+    __slots__ = ()
+
     def yearly_depreciation(self):
         return 0.01
 
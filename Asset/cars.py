@@ -4,10 +4,14 @@ from Asset.car_base import Car
 
 
 class Lambourghini(Car):
+    __slots__ = ()
+
     def yearly_depreciation(self):
         return 0.01
 
 
 class Lexus(Car):
+    __slots__ = ()
+
     def yearly_depreciation(self):
         return 0.06
@@ -4,5 +4,5 @@ from Asset.asset import Asset
 
 
 class House(Asset):
-    pass
+    __slots__ = ()
 
@@ -4,10 +4,14 @@ from Asset.house_base import House
 
 
 class PrimaryHome(House):
+    __slots__ = ()
+
     def yearly_depreciation(self):
         return 0.09
 
 
 class VacationHome(House):
+    __slots__ = ()
+
     def yearly_depreciation(self):
         return 0.06
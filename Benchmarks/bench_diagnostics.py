@@ -0,0 +1,76 @@
+"""
+This script measures the per-period cost of the eager f-string debug logging the Loan methods used to do
+against the level-guarded diagnostics, with diagnostics switched off and on
+"""
+
+import logging
+from Loan.auto_loan import AutoLoan
+from Asset.cars import Car
+from Diagnostics import diagnostics
+from Timer.timer import Timer
+
+
+def period_calls(loan, periods):
+    """Calls the per-period Loan methods that carry diagnostics"""
+    for n in range(periods):
+        loan.balance(n)
+        loan.interest_due(n)
+        loan.principal_due(n)
+        loan.recovery_value(n)
+        loan.equity(n)
+
+
+def eager_period_calls(loan, periods):
+    """The same calls, each followed by the f-string logging.debug the methods used to make"""
+    for n in range(periods):
+        bal = loan.balance(n)
+        logging.debug(f'balance at period {n} is {bal}')
+        interest = loan.interest_due(n)
+        logging.debug(f'interest due at period {n} is {interest}')
+        prin = loan.principal_due(n)
+        logging.debug(f'Principal due at period {n} is {prin}')
+        r = loan.recovery_value(n)
+        logging.debug(f'Recovery value at period {n} is {r}')
+        e = loan.equity(n)
+        logging.debug(f'Equity value at period {n} is {e}')
+
+
+def main(num_loans=1500, periods=70):
+    loans = [AutoLoan(10000 + i, 0.05, 60, Car(15000)) for i in range(num_loans)]
+    for loan in loans:
+        loan.schedule()  # build the schedules outside the timed loops
+    calls = num_loans * periods
+
+    timings = {}
+    with Timer('Eager f-string logging') as t:
+        for loan in loans:
+            eager_period_calls(loan, periods)
+    timings['eager'] = t.retrieveLastResult()
+
+    with Timer('Diagnostics off') as t:
+        for loan in loans:
+            period_calls(loan, periods)
+    timings['off'] = t.retrieveLastResult()
+
+    # switched on, but with a handler that drops the records, to show the cost of formatting and dispatch
+    root = logging.getLogger()
+    handlers, level = root.handlers, root.level
+    root.handlers = [logging.NullHandler()]
+    diagnostics.enable('Loan')
+    try:
+        with Timer('Diagnostics on') as t:
+            for loan in loans:
+                period_calls(loan, periods)
+        timings['on'] = t.retrieveLastResult()
+    finally:
+        diagnostics.disable('Loan')
+        root.handlers, root.level = handlers, level
+
+    for name, seconds in timings.items():
+        print(f'{name}: {seconds / calls * 1e6:.3f} microseconds per loan period')
+    print(f'Overhead removed with diagnostics off: {(timings["eager"] - timings["off"]) / calls * 1e6:.3f} '
+          f'microseconds per loan period ({timings["eager"] / timings["off"]:.2f}x)')
+
+
+if __name__ == '__main__':
+    main()
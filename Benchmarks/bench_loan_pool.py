@@ -0,0 +1,57 @@
+"""
+This script benchmarks the per-object LoanPool against the ColumnarLoanPool on the loan tape
+"""
+
+import csv
+import numpy as np
+from Loan.loan_pool import LoanPool
+from Loan.columnar_pool import ColumnarLoanPool
+from Loan.loans import VariableRateLoan
+from Timer.timer import Timer
+from main import create_loan
+
+
+def load_loans(filename):
+    """Creates Loan objects from csv input"""
+    with open(filename) as file:
+        reader = csv.DictReader(file)
+        return [create_loan(row.get('Loan Type'), row.get('Asset'), row.get('Asset Value'), row.get('Balance'),
+                            row.get('Rate'), row.get('Term')) for row in reader]
+
+
+def aggregate(loan_pool, periods):
+    """Runs every LoanPool aggregation for each period"""
+    return [[loan_pool.active_loans(n), loan_pool.balance(n), loan_pool.principal_due(n),
+             loan_pool.interest_due(n)] for n in range(periods)]
+
+
+def compare(loans, label):
+    """Times both pools on the loans and prints the speedup and the largest relative difference"""
+    periods = max(loan.term for loan in loans) + 2
+
+    with Timer(f'Per-object LoanPool ({label})') as t:
+        object_results = aggregate(LoanPool(loans), periods)
+    object_time = t.retrieveLastResult()
+
+    with Timer(f'ColumnarLoanPool ({label})') as t:
+        columnar_results = aggregate(ColumnarLoanPool(loans), periods)
+    columnar_time = t.retrieveLastResult()
+
+    object_results = np.array(object_results)
+    columnar_results = np.array(columnar_results)
+    max_diff = np.max(np.abs(object_results - columnar_results) / (1 + np.abs(object_results)))
+    print(f'{label}: speedup {object_time / columnar_time:.1f}x, max relative difference: {max_diff}')
+
+
+def main():
+    loans = load_loans('Loans_csv.csv')
+    compare(loans, 'fixed rate')
+
+    # the same tape with every rate stepping up by 2% after the first year
+    floating = [VariableRateLoan(loan.notional, {0: loan.rate, 12: loan.rate + 0.02}, loan.term, loan.asset)
+                for loan in loans]
+    compare(floating, 'floating rate')
+
+
+if __name__ == '__main__':
+    main()
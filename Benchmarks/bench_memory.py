@@ -0,0 +1,57 @@
+"""
+This script measures the memory and pickling cost of building a pool of AutoLoan and Car objects, comparing
+the slotted classes against equivalent classes that carry a per-instance __dict__
+"""
+
+import pickle
+import tracemalloc
+from Loan.auto_loan import AutoLoan
+from Asset.cars import Car
+from Tranche.standard_tranche import StandardTranche
+from Timer.timer import Timer
+
+
+class DictCar(Car):
+    """Car with a per-instance __dict__, as the classes were before __slots__"""
+
+
+class DictAutoLoan(AutoLoan):
+    """AutoLoan with a per-instance __dict__, as the classes were before __slots__"""
+
+
+class DictStandardTranche(StandardTranche):
+    """StandardTranche with a per-instance __dict__, as the classes were before __slots__"""
+
+
+def build_pool(num_loans, loan_class, car_class):
+    """Creates num_loans loan and car pairs"""
+    return [loan_class(10000 + i, 0.05, 60, car_class(15000 + i)) for i in range(num_loans)]
+
+
+def measure(name, build):
+    """Returns the bytes allocated by build, and the pickle size and time of what it returns"""
+    tracemalloc.start()
+    objects = build()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    with Timer(f'Pickle {name}') as t:
+        payload = pickle.dumps(objects, protocol=pickle.HIGHEST_PROTOCOL)
+    return size, len(payload), t.retrieveLastResult()
+
+
+def main(num_loans=100000):
+    results = {'__dict__ loans': measure('__dict__ loans', lambda: build_pool(num_loans, DictAutoLoan, DictCar)),
+               '__slots__ loans': measure('__slots__ loans', lambda: build_pool(num_loans, AutoLoan, Car)),
+               '__dict__ tranches': measure('__dict__ tranches', lambda: [DictStandardTranche(1000.0, 0.05, 'A')
+                                                                          for _ in range(num_loans // 10)]),
+               '__slots__ tranches': measure('__slots__ tranches', lambda: [StandardTranche(1000.0, 0.05, 'A')
+                                                                            for _ in range(num_loans // 10)])}
+    for name, (size, pickled, seconds) in results.items():
+        count = num_loans if 'loans' in name else num_loans // 10
+        print(f'{name}: {size / count:.0f} bytes per object, {pickled / count:.0f} pickled bytes per object, '
+              f'pickled in {seconds:.3f} seconds')
+    print(f'Loan pool memory saved: {1 - results["__slots__ loans"][0] / results["__dict__ loans"][0]:.0%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+This script benchmarks starting worker processes per simulation against a persistent WaterfallPool
+"""
+
+import pickle
+from Loan.columnar_pool import ColumnarLoanPool
+from Tranche.structured_security import StructuredSecurity
+from Simulations.sim_waterfall_parallel import simulate_waterfall_parallel, WaterfallPool
+from Timer.timer import Timer
+from Benchmarks.bench_loan_pool import load_loans
+
+
+def main(iterations=5, num_sim=40, num_processes=4):
+    loan_pool = ColumnarLoanPool(load_loans('Loans_csv.csv'))
+    security = StructuredSecurity(loan_pool.total_principal(), 'Sequential')
+    security.add_tranche(0.8, 0.05, 'A')
+    security.add_tranche(0.2, 0.08, 'B')
+
+    # serialization cost of what is shipped to the workers
+    with Timer('Pickle loan pool and structured security') as t:
+        payload = pickle.dumps((loan_pool, security))
+    print(f'Loan pool payload: {len(payload)} bytes, tranche rates payload: '
+          f'{len(pickle.dumps(security.get_rates()))} bytes')
+
+    with Timer('Start persistent pool') as t:
+        pool = WaterfallPool(loan_pool, security, num_processes)
+        pool.simulate(security.get_rates(), num_processes)  # wait until every worker has loaded the pool
+    startup_time = t.retrieveLastResult()
+
+    with Timer(f'{iterations} iterations with a new pool per iteration') as t:
+        for _ in range(iterations):
+            simulate_waterfall_parallel(loan_pool, security, num_sim, num_processes)
+    fresh_time = t.retrieveLastResult()
+
+    with Timer(f'{iterations} iterations on the persistent pool') as t:
+        for _ in range(iterations):
+            pool.simulate(security.get_rates(), num_sim)
+    persistent_time = t.retrieveLastResult()
+    pool.close()
+
+    print(f'Startup: {startup_time:.2f}s, saved per iteration: {(fresh_time - persistent_time) / iterations:.2f}s')
+
+
+if __name__ == '__main__':
+    main()
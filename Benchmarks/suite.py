@@ -0,0 +1,163 @@
+"""
+This script runs the benchmark suite for the loan, waterfall and Monte Carlo hot paths on synthetic pools
+built from the loan tape at several scales. Results are written as JSON and can be saved as a baseline on
+one machine and compared against later runs on the same machine:
+
+    python -m Benchmarks.suite --save-baseline baseline.json
+    python -m Benchmarks.suite --compare baseline.json
+"""
+
+import sys
+import json
+import time
+import argparse
+import platform
+import numpy as np
+from Loan.loan_pool import LoanPool
+from Loan.columnar_pool import ColumnarLoanPool
+from Loan.loan_tape import LoanTapeLoader
+from Tranche.structured_security import StructuredSecurity
+from Simulations.sim_waterfall import simulate_waterfall, simulate_waterfall_batched
+from Simulations.sim_waterfall_parallel import simulate_waterfall_parallel
+from Simulations.run_monte import run_monte
+from waterfall import do_waterfall
+
+
+def synthetic_pool(tape, scale, seed=0):
+    """
+    Returns a ColumnarLoanPool scale times the size of the tape pool: the tape loans followed by loans
+    resampled from the tape with a fixed seed, so every run benchmarks the same pool
+    """
+    num_loans = len(tape.notionals)
+    rng = np.random.default_rng(seed)
+    index = np.concatenate((np.arange(num_loans), rng.integers(0, num_loans, (scale - 1) * num_loans)))
+    return ColumnarLoanPool.from_columns(tape.notionals[index], tape.rates[index], tape.terms[index],
+                                         tape.asset_values[index], tape.asset_depreciation[index],
+                                         tape.class_codes[index], tape.classes)
+
+
+def make_security(loan_pool):
+    """Returns the two tranche Sequential structured security used in main"""
+    security = StructuredSecurity(loan_pool.total_principal(), 'Sequential')
+    security.add_tranche(0.8, 0.05, 'A', 1.2)
+    security.add_tranche(0.2, 0.08, 'B', 0.8)
+    return security
+
+
+def loan_methods(loans):
+    """Calls Loan.balance and Loan.interest_due for every period of every loan"""
+    for loan in loans:
+        for n in range(loan.term + 2):
+            loan.balance(n)
+            loan.interest_due(n)
+
+
+def aggregate(loan_pool, periods):
+    """Runs every LoanPool aggregation for each period"""
+    for n in range(periods):
+        loan_pool.active_loans(n)
+        loan_pool.balance(n)
+        loan_pool.principal_due(n)
+        loan_pool.interest_due(n)
+
+
+# name -> (scales it runs at, setup(tape, scale) returning the arguments, function timed on those arguments)
+BENCHMARKS = {
+    'loan_balance_interest': ((1, 10), lambda tape, scale: (synthetic_pool(tape, scale).loans,), loan_methods),
+    'loan_pool_aggregation': ((1, 10), lambda tape, scale: (LoanPool(synthetic_pool(tape, scale).loans),
+                                                            int(tape.terms.max()) + 2), aggregate),
+    'columnar_pool_aggregation': ((1, 10, 100), lambda tape, scale: (synthetic_pool(tape, scale),
+                                                                     int(tape.terms.max()) + 2), aggregate),
+    'do_waterfall': ((1,), lambda tape, scale: (LoanPool(synthetic_pool(tape, scale).loans),),
+                     lambda pool: do_waterfall(pool, make_security(pool), np.random.default_rng(0))),
+    'do_waterfall_columnar': ((1, 10, 100), lambda tape, scale: (synthetic_pool(tape, scale),),
+                              lambda pool: do_waterfall(pool, make_security(pool), np.random.default_rng(0))),
+    'simulate_waterfall_serial': ((1, 10), lambda tape, scale: (synthetic_pool(tape, scale),),
+                                  lambda pool: simulate_waterfall(pool, make_security(pool), 20, seed=0)),
+    'simulate_waterfall_parallel': ((1, 10), lambda tape, scale: (synthetic_pool(tape, scale),),
+                                    lambda pool: simulate_waterfall_parallel(pool, make_security(pool), 20, 4,
+                                                                             seed=0)),
+    'simulate_waterfall_batched': ((1, 10, 100), lambda tape, scale: (synthetic_pool(tape, scale),),
+                                   lambda pool: simulate_waterfall_batched(pool, make_security(pool), 200,
+                                                                           seed=0)),
+    'run_monte': ((1,), lambda tape, scale: (synthetic_pool(tape, scale),),
+                  lambda pool: run_monte(pool, make_security(pool), 0.005, 200, 4, seed=0, common_paths=True)),
+}
+
+
+def run_benchmark(tape, name, scale, repeats):
+    """Returns the fastest and median wall times of repeats runs, each on freshly built inputs"""
+    _, setup, function = BENCHMARKS[name]
+    times = []
+    for _ in range(repeats):
+        args = setup(tape, scale)
+        start = time.perf_counter()
+        function(*args)
+        times.append(time.perf_counter() - start)
+    return {'name': name, 'scale': scale, 'loans': scale * len(tape.notionals), 'repeats': repeats,
+            'min_seconds': min(times), 'median_seconds': float(np.median(times))}
+
+
+def run_suite(tape_file='Loans_csv.csv', scales=(1, 10, 100), names=None, repeats=3):
+    """Runs the selected benchmarks at the selected scales and returns the results document"""
+    tape = LoanTapeLoader(tape_file).load()
+    results = []
+    for name in names or BENCHMARKS:
+        for scale in BENCHMARKS[name][0]:
+            if scale in scales:
+                result = run_benchmark(tape, name, scale, repeats)
+                print(f'{name} x{scale}: {result["min_seconds"]:.4f} seconds')
+                results.append(result)
+    return {'machine': {'platform': platform.platform(), 'processor': platform.processor(),
+                        'python': platform.python_version(), 'numpy': np.__version__},
+            'tape': tape_file, 'results': results}
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Compares each benchmark's fastest time with the baseline and returns the ones that are more than
+    tolerance slower
+    """
+    baseline_times = {(r['name'], r['scale']): r['min_seconds'] for r in baseline['results']}
+    regressions = []
+    for result in results['results']:
+        before = baseline_times.get((result['name'], result['scale']))
+        if before is None:
+            continue
+        ratio = result['min_seconds'] / before
+        print(f'{result["name"]} x{result["scale"]}: {before:.4f} -> {result["min_seconds"]:.4f} seconds '
+              f'({ratio:.2f}x)')
+        if ratio > 1 + tolerance:
+            regressions.append(result | {'baseline_seconds': before, 'ratio': ratio})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Runs the loan, waterfall and Monte Carlo benchmarks')
+    parser.add_argument('--tape', default='Loans_csv.csv', help='loan tape the synthetic pools are built from')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100], help='pool sizes in tapes')
+    parser.add_argument('--benchmarks', nargs='+', choices=list(BENCHMARKS), help='benchmarks to run')
+    parser.add_argument('--repeats', type=int, default=3, help='runs per benchmark; the fastest is kept')
+    parser.add_argument('--output', default='benchmark_results.json', help='JSON file for the results')
+    parser.add_argument('--save-baseline', help='also save the results as this baseline file')
+    parser.add_argument('--compare', help='baseline file to compare the results against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='slowdown allowed before a regression')
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.tape, args.scales, args.benchmarks, args.repeats)
+    for filename in filter(None, (args.output, args.save_baseline)):
+        with open(filename, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f'Regression: {regression["name"]} x{regression["scale"]} is {regression["ratio"]:.2f}x '
+                  f'the baseline')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""
+This module contains the Diagnostics class used for debug messages on the hot paths of the Loan, LoanPool
+and Tranche classes, and the per-module switches that turn them on and off
+"""
+import logging
+
+_diagnostics = {}  # module name -> Diagnostics
+_enabled = {}  # module or package name -> level, for modules switched on before they are imported
+
+
+class Diagnostics(object):
+    """
+    Debug messages for one module that cost a single attribute check while the module is switched off.
+    Hot paths guard each call with `if diagnostics.enabled:`; messages use lazy %-style arguments so they
+    are only formatted if a handler actually emits them.
+    """
+
+    def __init__(self, name):
+        self._logger = logging.getLogger(name)
+        self.enabled = False
+        self.level = logging.DEBUG
+
+    @property
+    def name(self):
+        return self._logger.name
+
+    @property
+    def logger(self):
+        return self._logger
+
+    def log(self, msg, *args):
+        """Logs msg % args at the module diagnostics level"""
+        self._logger.log(self.level, msg, *args)
+
+
+def _matches(name, module):
+    """Returns True if module is name itself or a module of package name"""
+    return module == name or module.startswith(name + '.')
+
+
+def _switch(diagnostics):
+    """Applies the most specific enable/disable setting to a module's diagnostics"""
+    names = [name for name in _enabled if _matches(name, diagnostics.name)]
+    level = _enabled[max(names, key=len)] if names else None
+    diagnostics.enabled = level is not None
+    if level is not None:
+        diagnostics.level = level
+        if not diagnostics.logger.isEnabledFor(level):
+            diagnostics.logger.setLevel(level)
+
+
+def get_diagnostics(name):
+    """Returns the Diagnostics for a module, normally called with __name__ at import"""
+    diagnostics = _diagnostics.get(name)
+    if diagnostics is None:
+        diagnostics = _diagnostics[name] = Diagnostics(name)
+        _switch(diagnostics)
+    return diagnostics
+
+
+def enable(name, level=logging.DEBUG):
+    """Switches on diagnostics for a module or a whole package (e.g. 'Loan' or 'Loan.loan_base')"""
+    _enabled[name] = level
+    for diagnostics in _diagnostics.values():
+        _switch(diagnostics)
+
+
+def disable(name):
+    """Switches off diagnostics for a module or a whole package"""
+    _enabled[name] = None
+    for diagnostics in _diagnostics.values():
+        _switch(diagnostics)
+
+
+def enabled_modules():
+    """Returns the names of the modules whose diagnostics are switched on"""
+    return sorted(name for name, diagnostics in _diagnostics.items() if diagnostics.enabled)
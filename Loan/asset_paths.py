@@ -0,0 +1,79 @@
+"""
+This module contains the Asset Paths class which holds simulated loan pool cashflows
+"""
+import numpy as np
+
+
+class AssetPaths(object):
+    """
+    Simulated loan pool cashflows as (path x period) matrices. Column n holds period n, so column 0 is
+    the start of the deal and is always zero. Importance sampled paths carry relative weights (their
+    likelihood ratios) for weighted averages of path metrics; otherwise weights is None.
+    """
+
+    def __init__(self, principal, interest, recoveries, balance, weights=None):
+        self._principal = principal
+        self._interest = interest
+        self._recoveries = recoveries
+        self._balance = balance
+        self._weights = weights
+
+    @property
+    def principal(self):
+        return self._principal
+
+    @property
+    def interest(self):
+        return self._interest
+
+    @property
+    def recoveries(self):
+        return self._recoveries
+
+    @property
+    def balance(self):
+        return self._balance
+
+    @property
+    def weights(self):
+        return self._weights
+
+    @property
+    def collections(self):
+        """Total cash collected from the loan pool in each path and period"""
+        return self._principal + self._interest + self._recoveries
+
+    @property
+    def num_paths(self):
+        return self._principal.shape[0]
+
+    @property
+    def periods(self):
+        """Returns the last simulated period"""
+        return self._principal.shape[1] - 1
+
+    def save(self, filename, metadata=None):
+        """
+        Saves the simulated cashflows to a NumPy .npz file, with an optional dict of metadata arrays
+        describing how they were simulated
+        """
+        arrays = dict(principal=self._principal, interest=self._interest, recoveries=self._recoveries,
+                      balance=self._balance)
+        if self._weights is not None:
+            arrays['weights'] = self._weights
+        if metadata is not None:
+            arrays.update({f'meta_{name}': np.asarray(value) for name, value in metadata.items()})
+        np.savez(filename, **arrays)
+
+    @staticmethod
+    def load_metadata(filename):
+        """Returns the metadata saved with the cashflows in filename (empty if none was saved)"""
+        with np.load(filename) as data:
+            return {name[len('meta_'):]: data[name] for name in data.files if name.startswith('meta_')}
+
+    @classmethod
+    def load(cls, filename):
+        """Loads simulated cashflows saved with save"""
+        with np.load(filename) as data:
+            weights = data['weights'] if 'weights' in data else None
+            return cls(data['principal'], data['interest'], data['recoveries'], data['balance'], weights)
@@ -6,9 +6,9 @@ from Asset.car_base import Car
 
 
 class AutoLoan(FixedRateLoan):
+    __slots__ = ()
+
     def __init__(self, notional, rate, term, car):
         super(AutoLoan, self).__init__(notional, rate, term, car)
         if not isinstance(car, Car):
             print("Error: car parameter is wrong class type")
-        else:
-            self._car = car
@@ -0,0 +1,65 @@
+"""
+This module contains the per-instance memoize decorator used by the Loan classes
+"""
+import weakref
+from collections import namedtuple, OrderedDict
+from functools import wraps
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+# instance -> {method: OrderedDict of results}. Weak keys let loans be garbage collected with their results.
+# Keyed on the function, not its name, so a subclass override and the method it calls through super() keep
+# separate results.
+_instance_caches = weakref.WeakKeyDictionary()
+
+
+def memoize(f=None, maxsize=512):
+    """
+    Memoizes a method per instance with a least recently used cache of at most maxsize results per instance.
+    The wrapped method exposes cache_info() with hit/miss statistics and cache_clear().
+    """
+    if f is None:
+        return lambda func: memoize(func, maxsize)
+
+    stats = {'hits': 0, 'misses': 0}
+
+    @wraps(f)
+    def wrapped(self, *args, **kwargs):
+        key = args + tuple(sorted(kwargs.items())) if kwargs else args
+        caches = _instance_caches.get(self)
+        if caches is None:
+            caches = _instance_caches[self] = {}
+        cache = caches.get(f)
+        if cache is None:
+            cache = caches[f] = OrderedDict()
+        elif key in cache:
+            stats['hits'] += 1
+            cache.move_to_end(key)
+            return cache[key]
+
+        stats['misses'] += 1
+        result = f(self, *args, **kwargs)
+        cache[key] = result
+        if len(cache) > maxsize:
+            cache.popitem(last=False)  # evict the least recently used result
+        return result
+
+    def cache_info():
+        """Returns the hit/miss statistics and the number of results cached across all instances"""
+        currsize = sum(len(caches.get(f, ())) for caches in _instance_caches.values())
+        return CacheInfo(stats['hits'], stats['misses'], maxsize, currsize)
+
+    def cache_clear():
+        """Clears the cached results of every instance and resets the statistics"""
+        for caches in _instance_caches.values():
+            caches.pop(f, None)
+        stats['hits'] = stats['misses'] = 0
+
+    wrapped.cache_info = cache_info
+    wrapped.cache_clear = cache_clear
+    return wrapped
+
+
+def clear_instance(instance):
+    """Drops every memoized result held for an instance, e.g. after one of its attributes changed"""
+    _instance_caches.pop(instance, None)
@@ -0,0 +1,330 @@
+"""
+This module contains the Columnar Loan Pool class
+"""
+from Loan.loan_pool import LoanPool
+from Loan.loan_base import Loan
+from Loan.asset_paths import AssetPaths
+from Loan.variance_reduction import draw_uniforms, tilt_hazard, log_likelihood_ratios
+from Diagnostics.diagnostics import get_diagnostics
+from importlib import import_module
+import os
+import numpy as np
+
+diagnostics = get_diagnostics(__name__)
+
+
+class ColumnarLoanPool(LoanPool):
+    """
+    Loan pool that holds its loans as NumPy columns (notional, rate, term, default flag) and computes
+    the amortization of every loan in one batched pass. Loans whose rate can change (e.g. VariableRateLoan)
+    also keep their rate for every period, looked up with get_rate, and are amortized from reset to reset.
+    Returns the same numbers as the per-object LoanPool.
+    """
+
+    def __init__(self, loans, default_model=None, recovery_model=None):
+        super(ColumnarLoanPool, self).__init__(loans, default_model, recovery_model)
+        self._build_columns()
+
+    @classmethod
+    def from_columns(cls, notionals, rates, terms, asset_values, asset_depreciation, class_codes=None,
+                     classes=None, variable_index=None, rate_matrix=None):
+        """
+        Creates a pool straight from loan columns without Loan objects. classes is a list of
+        (loan class, asset class) pairs and class_codes gives each loan's index into it; they are only
+        needed to create Loan objects on demand through the loans property. Loans whose rate can change are
+        listed in variable_index, with their rates for periods 0 to max term + 1 in the columns of rate_matrix.
+        """
+        pool = cls.__new__(cls)
+        LoanPool.__init__(pool, None)
+        pool._set_columns(notionals, rates, terms, asset_values, asset_depreciation, class_codes, classes,
+                          variable_index, rate_matrix)
+        return pool
+
+    def save(self, dirname):
+        """
+        Saves the loan columns as one .npy file per column in dirname, so the pool can be reloaded, or
+        memory-mapped by several processes, without parsing the loan tape again
+        """
+        os.makedirs(dirname, exist_ok=True)
+        for name in ('notionals', 'rates', 'terms', 'asset_values', 'asset_depreciation', 'class_codes',
+                     'variable_index', 'rate_matrix'):
+            if getattr(self, name) is not None:
+                np.save(os.path.join(dirname, f'{name}.npy'), getattr(self, name))
+        if self._classes is not None:
+            names = [[f'{cls.__module__}:{cls.__qualname__}' for cls in pair] for pair in self._classes]
+            np.save(os.path.join(dirname, 'classes.npy'), np.array(names, dtype=str).reshape(-1, 2))
+
+    @classmethod
+    def load(cls, dirname, mmap_mode='r'):
+        """Loads a pool saved with save; with mmap_mode the columns are memory-mapped instead of read"""
+        columns = {}
+        for name in ('notionals', 'rates', 'terms', 'asset_values', 'asset_depreciation', 'class_codes',
+                     'classes', 'variable_index', 'rate_matrix'):
+            filename = os.path.join(dirname, f'{name}.npy')
+            columns[name] = np.load(filename, mmap_mode=mmap_mode) if os.path.exists(filename) else None
+        classes = None
+        if columns['classes'] is not None:
+            classes = [tuple(getattr(import_module(module), qualname) for module, qualname in
+                             (name.split(':') for name in pair)) for pair in columns['classes']]
+        return cls.from_columns(columns['notionals'], columns['rates'], columns['terms'], columns['asset_values'],
+                                columns['asset_depreciation'], columns['class_codes'], classes,
+                                columns['variable_index'], columns['rate_matrix'])
+
+    def __iter__(self):
+        """Returns the Iterator object"""
+        for i in self.loans:
+            yield i
+
+    @property
+    def loans(self):
+        """Returns the Loan objects, creating them from the columns if the pool was built without them"""
+        if self._loans is None:
+            rates = list(self._rates)
+            if self._variable_index is not None:
+                for k, i in enumerate(self._variable_index):
+                    rates[i] = self._rate_dict(self._rate_matrix[:, k])
+            self._loans = [loan_class(notional, rate, int(term), asset_class(value)) for
+                           (loan_class, asset_class), notional, rate, term, value in
+                           zip((self._classes[c] for c in self._class_codes), self._notionals, rates,
+                               self._terms, self._asset_values)]
+        return self._loans
+
+    @staticmethod
+    def _rate_dict(rates):
+        """Returns the {start period: rate} dictionary of a column of per-period rates"""
+        starts = np.flatnonzero(np.diff(rates, prepend=np.nan) != 0)
+        return {int(n): float(rates[n]) for n in starts}
+
+    @loans.setter
+    def loans(self, iloans):
+        self._loans = iloans
+        self._build_columns()
+
+    @property
+    def notionals(self):
+        return self._notionals
+
+    @property
+    def rates(self):
+        return self._rates
+
+    @property
+    def terms(self):
+        return self._terms
+
+    @property
+    def asset_values(self):
+        return self._asset_values
+
+    @property
+    def asset_depreciation(self):
+        return self._asset_depreciation
+
+    @property
+    def class_codes(self):
+        return self._class_codes
+
+    @property
+    def classes(self):
+        return self._classes
+
+    @property
+    def default_flags(self):
+        return self._default_flags
+
+    @property
+    def variable_index(self):
+        return self._variable_index
+
+    @property
+    def rate_matrix(self):
+        return self._rate_matrix
+
+    def _build_columns(self):
+        """Copies the loan attributes into NumPy columns"""
+        classes = {}
+        class_codes = [classes.setdefault((type(loan), type(loan.asset)), len(classes)) for loan in self._loans]
+        # loans of classes with their own get_rate keep a rate per period, from the vectorized lookup
+        variable_index = [i for i, loan in enumerate(self._loans) if type(loan).get_rate is not Loan.get_rate]
+        rate_matrix = None
+        if variable_index:
+            periods = np.arange(max(loan.term for loan in self._loans) + 2)
+            rate_matrix = np.column_stack([np.broadcast_to(self._loans[i].get_rate(periods), periods.shape)
+                                           for i in variable_index])
+        self._set_columns([loan.notional for loan in self._loans], [loan.rate for loan in self._loans],
+                          [loan.term for loan in self._loans], [loan.asset.initial_value for loan in self._loans],
+                          [loan.asset.monthly_depreciation() for loan in self._loans], class_codes, list(classes),
+                          variable_index or None, rate_matrix)
+
+    def _set_columns(self, notionals, rates, terms, asset_values, asset_depreciation, class_codes, classes,
+                     variable_index=None, rate_matrix=None):
+        """Stores the loan columns as typed arrays and clears the amortization matrices"""
+        self._notionals = np.asarray(notionals, dtype=float)
+        self._rates = np.asarray(rates, dtype=float)
+        self._terms = np.asarray(terms, dtype=int)
+        self._asset_values = np.asarray(asset_values, dtype=float)
+        self._asset_depreciation = np.asarray(asset_depreciation, dtype=float)
+        self._class_codes = None if class_codes is None else np.asarray(class_codes, dtype=np.int16)
+        self._classes = classes
+        self._variable_index = None if variable_index is None else np.asarray(variable_index, dtype=np.int64)
+        self._rate_matrix = None if rate_matrix is None else np.asarray(rate_matrix, dtype=float)
+        self._default_flags = np.zeros(len(self._notionals), dtype=np.int8)
+        self._schedule = None
+        self._columns = {'rates': self._rates, 'notionals': self._notionals, 'asset_values': self._asset_values,
+                         'asset_depreciation': self._asset_depreciation}
+
+    def columns(self):
+        """Returns the loan columns read by the default and recovery models"""
+        return self._columns
+
+    def amortization(self):
+        """
+        Returns the (period x loan) balance, interest, principal and payment matrices for periods 0 to
+        max term + 1, ignoring defaults. Computed once and reused for every period.
+        """
+        if self._schedule is None:
+            horizon = int(self._terms.max()) + 1 if len(self._terms) else 0
+            periods = np.arange(horizon + 1)[:, None]
+            schedule = Loan.calc_schedule_array(self._notionals, self._rates, self._terms, periods)
+            schedule = [np.array(matrix) for matrix in (schedule.balance, schedule.interest, schedule.principal,
+                                                       schedule.payment)]
+            if self._variable_index is not None:
+                # loans whose rate resets are amortized from reset to reset on their per-period rates
+                index = self._variable_index
+                reset = Loan.calc_reset_schedule_array(self._notionals[index], self._rate_matrix[:horizon + 1],
+                                                       self._terms[index])
+                for matrix, values in zip(schedule, (reset.balance, reset.interest, reset.principal, reset.payment)):
+                    matrix[:, index] = values
+            self._schedule = tuple(schedule)
+        return self._schedule
+
+    def _period_row(self, matrix, n):
+        """Returns the row of an amortization matrix for period n with defaulted loans masked out"""
+        if n >= len(matrix):
+            return np.zeros(len(self._default_flags))
+        return (self._default_flags == 0) * matrix[n]
+
+    def active_loans(self, n):
+        """Returns the number of active loans at a given period"""
+        return int(np.count_nonzero((self._default_flags == 0) & (n < self._terms)))
+
+    def balance(self, n):
+        """Calculates the total balance for the loan pool for a given period"""
+        return float(self._period_row(self.amortization()[0], n).sum())
+
+    def principal_due(self, n):
+        """Calculates the aggregate principal due in a given period"""
+        return float(self._period_row(self.amortization()[2], n).sum())
+
+    def interest_due(self, n):
+        """Calculates the aggregate interest due in a given period"""
+        return float(self._period_row(self.amortization()[1], n).sum())
+
+    def total_principal(self):
+        """Calculates the total loan principal of the loan pool"""
+        return float(self._notionals.sum())
+
+    def WAR(self):
+        """Calculates the Weighted Average Rate for the loan pool"""
+        return float(np.dot(self._notionals, self._rates) / self.total_principal())
+
+    def WAM(self):
+        """Calculates the Weighted Average Maturity for the loan pool"""
+        return float(np.dot(self._notionals, self._terms) / self.total_principal())
+
+    def check_defaults(self, period, rng=None):
+        """Draws the defaults for a period from the random Generator rng (a fresh unseeded one if not given)"""
+        if rng is None:
+            rng = np.random.default_rng()
+        numbers = self._draw_defaults(period, len(self._default_flags), rng)
+        defaulted = numbers == 0
+        self._default_flags[defaulted] = 1
+        recoveries = float(self._recovery_model.recovery(np.array([period]), self, defaulted).sum()) \
+            if defaulted.any() else 0
+        self._recoveries[period] = recoveries
+        if diagnostics.enabled:
+            diagnostics.log('%s defaults at period %s recover %s', int(defaulted.sum()), period, recoveries)
+        return recoveries
+
+    def recovery_values(self, recovery_model=None):
+        """
+        Returns the (period x loan) matrix of recovery values for periods 0 to max term + 1, from the pool's
+        recovery model unless another is given
+        """
+        if recovery_model is None:
+            recovery_model = self._recovery_model
+        return recovery_model.recovery(np.arange(len(self.amortization()[0])), self)
+
+    def default_periods(self, uniforms, hazard=None):
+        """
+        Converts (path x loan) uniform draws into the period each loan defaults in, drawn from the default
+        model unless a hazard (hazard[k - 1] for period k, a vector or a (period x loan) array) is given.
+        Loans only default while outstanding; loans that never default get max term + 2.
+        """
+        horizon = len(self.amortization()[0]) - 1
+        if hazard is None:
+            hazard = self.hazard(np.arange(1, horizon + 1))
+        hazard = np.asarray(hazard)
+        if hazard.ndim == 2 and hazard.shape[1] > 1:
+            # loan level hazards: one cumulative default curve per loan. Each curve is non-decreasing, so
+            # counting the periods whose cumulative default is at or below the draw is the searchsorted below
+            cumulative_default = 1 - np.cumprod(1 - hazard, axis=0)
+            default_period = np.ones(uniforms.shape, dtype=int)
+            for period_default in cumulative_default:
+                default_period += period_default <= uniforms
+        else:
+            cumulative_default = 1 - np.cumprod(1 - hazard.ravel())
+            default_period = np.searchsorted(cumulative_default, uniforms, side='right') + 1
+        return np.where(default_period <= self._terms, default_period, horizon + 1)
+
+    def simulate_defaults(self, num_paths, chunk_size=None, rng=None, variance_reduction=None, tilt=1.1,
+                          hazard=None, recovery_model=None):
+        """
+        Simulates default times for every loan in every path at once and returns the resulting AssetPaths
+        of principal, interest, recoveries and balance per path and period. Draws from the random
+        Generator rng (a fresh unseeded one if not given). Defaults and recoveries follow the pool's
+        default and recovery models unless a hazard (hazard[k - 1] for period k, a vector or a
+        (period x loan) array) or another recovery model is given.
+
+        variance_reduction is None, 'antithetic', 'latin_hypercube' or 'importance'. Importance sampling
+        draws defaults from the hazard scaled up by tilt and gives each path its likelihood ratio as weight;
+        the weight of a path is a product over every loan, so large tilts leave a few paths with all the weight.
+        """
+        if rng is None:
+            rng = np.random.default_rng()
+        balance, interest, principal, _ = self.amortization()
+        recovery = self.recovery_values(recovery_model)
+        horizon = len(balance) - 1
+        num_loans = len(self._default_flags)
+        if chunk_size is None:
+            chunk_size = max(2, 4000000 // max(num_loans, 1))  # bounds the (path x loan) working arrays
+        if variance_reduction == 'antithetic':
+            chunk_size += chunk_size % 2  # keeps antithetic pairs in the same chunk
+        if hazard is None:
+            hazard = self.hazard(np.arange(1, horizon + 1))
+        sampling_hazard = tilt_hazard(hazard, tilt) if variance_reduction == 'importance' else hazard
+        log_weights = np.zeros(num_paths)
+
+        scheduled = np.stack([principal, interest, balance], axis=2)  # period x loan x (principal, interest, balance)
+        cashflows = np.zeros((num_paths, horizon + 1, 3))
+        recoveries = np.zeros((num_paths, horizon + 1))
+        for start in range(0, num_paths, chunk_size):
+            stop = min(start + chunk_size, num_paths)
+            uniforms = draw_uniforms(rng, stop - start, num_loans, variance_reduction)
+            default_period = self.default_periods(uniforms, sampling_hazard)
+            if variance_reduction == 'importance':
+                log_weights[start:stop] = log_likelihood_ratios(default_period, self._terms, hazard, sampling_hazard)
+            for n in range(1, horizon + 1):
+                cashflows[start:stop, n] = (default_period > n) @ scheduled[n]
+            path, loan = np.nonzero(default_period <= horizon)
+            period = default_period[path, loan]
+            np.add.at(recoveries, (path + start, period), recovery[period, loan])
+
+        weights = None
+        if variance_reduction == 'importance':
+            weights = np.exp(log_weights - log_weights.max())  # only relative weights matter
+        return AssetPaths(cashflows[:, :, 0], cashflows[:, :, 1], recoveries, cashflows[:, :, 2], weights)
+
+    def reset(self):
+        """Reset the loans in the loan pool"""
+        self._default_flags[:] = 0
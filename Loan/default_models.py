@@ -0,0 +1,143 @@
+"""
+This module contains the default models, which give the monthly default probability of every loan in every
+period for the loan pools and the default simulation
+"""
+import numpy as np
+
+
+def loan_columns(loans, selection=None):
+    """
+    Returns the loan rates, notionals, asset values and monthly asset depreciation as a dict of arrays: the
+    cached columns of a loan pool, a dict of such columns, or collected from an iterable of Loan objects.
+    selection (a boolean mask or index array) picks a subset of the loans.
+    """
+    if isinstance(loans, dict):
+        columns = loans
+    elif hasattr(loans, 'columns'):
+        columns = loans.columns()
+    else:
+        loans = list(loans)
+        columns = {'rates': np.array([loan.rate for loan in loans], dtype=float),
+                   'notionals': np.array([loan.notional for loan in loans], dtype=float),
+                   'asset_values': np.array([loan.asset.initial_value for loan in loans], dtype=float),
+                   'asset_depreciation': np.array([loan.asset.monthly_depreciation() for loan in loans],
+                                                  dtype=float)}
+    if selection is None:
+        return columns
+    return {name: column[selection] for name, column in columns.items()}
+
+
+class DefaultModel(object):
+    """
+    Base class of the default models. The hazard of each period is computed once into a table covering
+    periods 0 to max term + 1 (grown on demand), so looking periods up costs one indexing operation.
+    """
+    table_periods = 362
+
+    def __init__(self):
+        self._table = None
+
+    def _build_hazard(self, periods):
+        """Returns the monthly default probability for an array of periods"""
+        raise NotImplementedError
+
+    def hazard(self, periods):
+        """Returns the pool level monthly default probability for an array of periods from the hazard table"""
+        periods = np.asarray(periods)
+        horizon = int(periods.max(initial=0))
+        if self._table is None or len(self._table) <= horizon:
+            size = max(self.table_periods, horizon + 1, 2 * len(self._table) if self._table is not None else 0)
+            self._table = self._build_hazard(np.arange(size))
+            self._table.setflags(write=False)
+        return self._table[periods]
+
+    def default_probabilities(self, periods, loans=None):
+        """
+        Returns the monthly default probabilities for an array of periods as a (period x loan) array; pool
+        level models return a (period x 1) column that broadcasts over the loans
+        """
+        return self.hazard(periods)[:, None]
+
+
+class PiecewiseHazard(DefaultModel):
+    """Monthly default probability probabilities[i] for periods up to time_periods[i]"""
+
+    def __init__(self, time_periods=(10, 60, 120, 180, 210, 360),
+                 probabilities=(0.0005, 0.001, 0.002, 0.004, 0.002, 0.001)):
+        super(PiecewiseHazard, self).__init__()
+        self._time_periods = np.asarray(time_periods)
+        self._probabilities = np.asarray(probabilities, dtype=float)
+
+    @property
+    def time_periods(self):
+        return self._time_periods
+
+    @property
+    def probabilities(self):
+        return self._probabilities
+
+    def _build_hazard(self, periods):
+        index = np.searchsorted(self._time_periods, periods)  # (10, 60], (120, 180]
+        return self._probabilities[np.minimum(index, len(self._probabilities) - 1)]
+
+
+class ConstantCDR(DefaultModel):
+    """Constant annual conditional default rate, i.e. the same monthly default probability every period"""
+
+    def __init__(self, cdr=0.02):
+        super(ConstantCDR, self).__init__()
+        self._cdr = cdr
+
+    @property
+    def cdr(self):
+        return self._cdr
+
+    def _build_hazard(self, periods):
+        return np.full(len(periods), 1 - (1 - self._cdr) ** (1 / 12))
+
+
+class LoanLevelHazard(DefaultModel):
+    """
+    Scales the hazard of a pool level base model (PiecewiseHazard by default) for each loan by
+    exp(rate_sensitivity * (rate - reference_rate) + ltv_sensitivity * (LTV - reference_LTV)), where the
+    LTV is the notional over the asset value. The references default to the notional weighted averages of
+    the loans, so the average loan keeps the base hazard. The multipliers of the last loan columns seen are
+    kept, so a pool asking for its hazard every period computes them once.
+    """
+
+    def __init__(self, base_model=None, rate_sensitivity=10.0, ltv_sensitivity=2.0, reference_rate=None,
+                 reference_ltv=None):
+        super(LoanLevelHazard, self).__init__()
+        self._base_model = PiecewiseHazard() if base_model is None else base_model
+        self._rate_sensitivity = rate_sensitivity
+        self._ltv_sensitivity = ltv_sensitivity
+        self._reference_rate = reference_rate
+        self._reference_ltv = reference_ltv
+        self._multipliers = None  # (loan columns, their multipliers)
+
+    @property
+    def base_model(self):
+        return self._base_model
+
+    def _build_hazard(self, periods):
+        return self._base_model.hazard(periods)
+
+    def multipliers(self, loans):
+        """Returns the hazard multiplier of each loan"""
+        columns = loan_columns(loans)
+        if self._multipliers is not None and self._multipliers[0] is columns:
+            return self._multipliers[1]
+        ltv = columns['notionals'] / columns['asset_values']
+        weights = columns['notionals']
+        reference_rate = np.average(columns['rates'], weights=weights) if self._reference_rate is None \
+            else self._reference_rate
+        reference_ltv = np.average(ltv, weights=weights) if self._reference_ltv is None else self._reference_ltv
+        multipliers = np.exp(self._rate_sensitivity * (columns['rates'] - reference_rate) +
+                             self._ltv_sensitivity * (ltv - reference_ltv))
+        self._multipliers = (columns, multipliers)
+        return multipliers
+
+    def default_probabilities(self, periods, loans=None):
+        if loans is None:
+            return super(LoanLevelHazard, self).default_probabilities(periods)
+        return np.minimum(self.hazard(periods)[:, None] * self.multipliers(loans), 1)
@@ -3,25 +3,21 @@ This module contains the basic Loan Class
 """
 from Asset.asset import Asset
 import logging
-from functools import wraps
+from Loan.cache import memoize, clear_instance
+from Loan.recovery_models import ConstantRecovery
+from Diagnostics.diagnostics import get_diagnostics
+from collections import namedtuple
 import numpy as np
 
+Schedule = namedtuple('Schedule', ['payment', 'interest', 'principal', 'balance'])
 
-def memoize(f):
-    """Memoize the result of a function"""
-    memory = {}
-
-    @wraps(f)
-    def wrapped(*args, **kwargs):
-        key = str(args) + str(kwargs)
-        if key not in memory:
-            memory[key] = f(*args, **kwargs)
-        return memory[key]
-
-    return wrapped
+diagnostics = get_diagnostics(__name__)
 
 
 class Loan(object):
+    # no per-instance __dict__; __weakref__ lets the memoize cache key results by loan
+    __slots__ = ('_notional', '_term', '_rate', '_asset', '_default_flag', '_schedule', '__weakref__')
+    default_recovery_model = ConstantRecovery()  # used when the loan is not valued by a loan pool
 
     def __init__(self, notional, rate, term, asset):
         self._notional = notional
@@ -37,6 +33,7 @@ class Loan(object):
         else:
             self._asset = asset
         self._default_flag = 0
+        self._schedule = None
 
     # getter/setter property functions
     @property
@@ -46,6 +43,7 @@ class Loan(object):
     @notional.setter
     def notional(self, inotional):
         self._notional = inotional
+        self._invalidate()
 
     @property
     def rate(self):
@@ -58,6 +56,7 @@ class Loan(object):
             raise ValueError("Rate cannot be 0. Please enter correct rate.")
         else:
             self._rate = irate
+            self._invalidate()
 
     # adjusting term property
     @property
@@ -67,6 +66,7 @@ class Loan(object):
     @term.setter
     def term(self, iterm):
         self._term = iterm
+        self._invalidate()
 
     # asset parameter getter/setter
     @property
@@ -80,6 +80,7 @@ class Loan(object):
             raise TypeError("Error: asset parameter is wrong class type")
         else:
             self._asset = iasset
+            self._invalidate()
 
     @staticmethod
     def monthly_rate(rate):
@@ -91,22 +92,41 @@ class Loan(object):
         """Converts monthly interest rate to annual rate"""
         return (1 + rate_monthly) ** 12 - 1
 
+    def _invalidate(self):
+        """Drops the cached schedule and memoized results after the loan has changed"""
+        self._schedule = None
+        clear_instance(self)
+
+    def schedule(self):
+        """Returns the amortization schedule, built on first use and cached until the loan is changed"""
+        if self._schedule is None:
+            self._schedule = self._build_schedule()
+        return self._schedule
+
+    def _build_schedule(self):
+        """Calculates the payment, interest, principal and balance for periods 0 to term + 1"""
+        periods = np.arange(self.term + 2)
+        rates = np.broadcast_to(np.asarray(self.get_rate(periods), dtype=float), periods.shape)
+        return self.calc_reset_schedule(self._notional, rates, self.term)
+
+    def _scheduled(self, column, n):
+        """Looks up a schedule column for period n, masked by the default flag"""
+        values = getattr(self.schedule(), column)
+        if n >= len(values):
+            return 0
+        return (self._default_flag == 0) * values[n]  # False = 0, True = 1
+
     def monthly_payment(self, n=None):
         """Calculates the monthly payment"""
-        if n == 0:
-            return 0
-        else:
-            rate = self.get_rate(n)
-            if not self.paid_off(self.term, n):
-                return (self._default_flag == 0) * self.calc_monthly_pmt(self._notional, rate, self.term)
-                # False = 0, True = 1
-            else:
-                return 0
+        if n is None:
+            return (self._default_flag == 0) * self.calc_monthly_pmt(self._notional, self.get_rate(), self.term)
+        return self._scheduled('payment', n)
 
     def total_payment(self):
         """Total payments over the entire term of the loan"""
         total = self.monthly_payment() * self.term
-        logging.debug(f'total payment is {total}')
+        if diagnostics.enabled:
+            diagnostics.log('total payment is %s', total)
         return total
 
     def total_interest(self):
@@ -114,35 +134,37 @@ class Loan(object):
         # total interest paid over the life of the loan is the total payments made minus
         # the initial principal amount
         total = self.total_payment() - self._notional
-        logging.debug(f'total interest is {total}')
+        if diagnostics.enabled:
+            diagnostics.log('total interest is %s', total)
         return total
 
+    def is_active(self, n):
+        """
+        Returns True while the loan is outstanding at period n: it has not defaulted and n is before its term.
+        Decided on the term rather than the balance, which is only float noise around maturity.
+        """
+        return self._default_flag == 0 and n < self._term
+
     def balance(self, n):
         """Calculates the remaining balance at period n"""
-        rate = self.get_rate(n)
-        return (self._default_flag == 0) * self.calc_balance(self._notional, rate, self.term, n)
+        return self._scheduled('balance', n)
 
     def interest_due(self, n):
         """Calculates the interest due at period n"""
-        rate = Loan.monthly_rate(self.get_rate(n))
-        if n == 0:
-            return 0
-        else:
-            interest = rate * self.balance(n - 1)
-            logging.debug(f'interest due at period {n} is {interest}')
-            return (self._default_flag == 0) * interest
+        interest = self._scheduled('interest', n)
+        if diagnostics.enabled:
+            diagnostics.log('interest due at period %s is %s', n, interest)
+        return interest
 
     def principal_due(self, n):
         """Calculates the principal due at period n"""
-        if n == 0:
-            return 0
-        else:
-            prin = self.monthly_payment(n) - self.interest_due(n)
-            logging.debug(f'Principal due at period {n} is {prin}')
-            return prin
+        prin = self._scheduled('principal', n)
+        if diagnostics.enabled:
+            diagnostics.log('Principal due at period %s is %s', n, prin)
+        return prin
 
     # Recursive versions of the same three methods
-    @memoize
+    @memoize(maxsize=512)
     def balance_rec(self, n):
         """Calculates the remaining balance at period n recursively"""
         if n == 0:
@@ -151,72 +173,162 @@ class Loan(object):
         else:
             return self.balance_rec(n - 1) - self.principal_due(n)
 
-    @memoize
+    @memoize(maxsize=512)
     def principal_due_rec(self, n):
         """Calculates the principal due at period n recursively"""
         return self.monthly_payment() - self.interest_due_rec(n)
 
-    @memoize
+    @memoize(maxsize=512)
     def interest_due_rec(self, n):
         """Calculates the interest due at period n recursively"""
         rate = Loan.monthly_rate(self._rate)
         return rate * self.balance_rec(n - 1)
 
     def get_rate(self, n=None):
-        """Returns a rate for a given period"""
+        """Returns a rate for a given period (or array of periods)"""
         return self._rate
 
-    def recovery_value(self, n):
-        """Returns the recovery value of an asset for a given period"""
-        r = self._asset.value(n) * 0.6
-        logging.debug(f'Recovery value at period {n} is {r}')
+    def recovery_value(self, n, recovery_model=None):
+        """
+        Returns the recovery value of an asset for a given period under recovery_model, which the loan pools
+        pass in (the default recovery model if not given)
+        """
+        if recovery_model is None:
+            recovery_model = self.default_recovery_model
+        r = self._asset.value(n) * recovery_model.recovery_rate(n, self)
+        if diagnostics.enabled:
+            diagnostics.log('Recovery value at period %s is %s', n, r)
         return r
 
     def equity(self, n):
         """Returns the remaining equity available at a given period"""
         e = self._asset.value(n) - self.balance(n)
-        logging.debug(f'Equity value at period {n} is {e}')
+        if diagnostics.enabled:
+            diagnostics.log('Equity value at period %s is %s', n, e)
         return e
 
-    def check_default(self, period, value):
-        """Determines whether a loan defaults"""
+    def check_default(self, period, value, recovery_model=None):
+        """Determines whether a loan defaults and returns its recovery value under recovery_model"""
         if value == 0:
             self._default_flag = 1
-            return self.recovery_value(period)
+            clear_instance(self)  # memoized results were calculated before the default
+            return self.recovery_value(period, recovery_model)
         else:
             return 0
 
     def reset(self):
         """Resets default flag to 0 for simulations"""
-        self._default_flag = 0
+        if self._default_flag:
+            self._default_flag = 0
+            clear_instance(self)
 
     # class level methods
 
+    @staticmethod
+    def _scalar(result):
+        """Returns plain Python numbers for scalar inputs and arrays otherwise"""
+        return result.item() if np.ndim(result) == 0 else result
+
     @classmethod
     def calc_monthly_pmt(cls, face, rate, term):
         """Calculates the monthly payment at the class level"""
-        # calculating the monthly rate using static-level method
-        monthly_rate = Loan.monthly_rate(rate)
-        pmt = (monthly_rate * face) / (1 - (1 + monthly_rate) ** (-term))
-        logging.debug(f'monthly payment is {pmt}')
-        return pmt
+        return cls._scalar(cls.calc_monthly_pmt_array(face, rate, term))
 
     @classmethod
     def calc_balance(cls, face, rate, term, period):
         """Calculates the balance at period in at the class level"""
-        monthly_rate = Loan.monthly_rate(rate)
-        if period > term:
-            logging.info(f'period {period} is greater than {term}')
-            return 0
-        else:
-            bal = (face * (1 + monthly_rate) ** period) - cls.calc_monthly_pmt(face, rate, term) * \
-                  ((1 + monthly_rate) ** period - 1) / monthly_rate
-            logging.debug(f'balance is {bal}')
-        return max(0, bal)
+        return cls._scalar(cls.calc_balance_array(face, rate, term, period))
 
     @classmethod
     def paid_off(cls, term, period):
-        po = False
-        if period > term:
-            po = True
-        return po
+        return cls._scalar(cls.paid_off_array(term, period))
+
+    # array versions of the class level methods; face, rate, term and period broadcast against each other
+
+    @classmethod
+    def calc_monthly_pmt_array(cls, face, rate, term):
+        """Calculates the monthly payments for arrays of face values, rates and terms"""
+        # calculating the monthly rate using static-level method
+        monthly_rate = Loan.monthly_rate(np.asarray(rate, dtype=float))
+        return (monthly_rate * face) / (1 - (1 + monthly_rate) ** (-np.asarray(term)))
+
+    @classmethod
+    def calc_balance_array(cls, face, rate, term, period):
+        """Calculates the balances at arrays of periods; 0 after the term and never below 0"""
+        monthly_rate = Loan.monthly_rate(np.asarray(rate, dtype=float))
+        growth = (1 + monthly_rate) ** np.asarray(period)
+        bal = (face * growth) - cls.calc_monthly_pmt_array(face, rate, term) * (growth - 1) / monthly_rate
+        return np.where(cls.paid_off_array(term, period), 0, np.maximum(0, bal))
+
+    @classmethod
+    def paid_off_array(cls, term, period):
+        """Returns True where the period is after the term"""
+        return np.asarray(period) > np.asarray(term)
+
+    @classmethod
+    def calc_schedule_array(cls, face, rate, term, periods):
+        """
+        Calculates the payment, interest, principal and balance Schedule for consecutive periods starting at 0,
+        laid out along the first axis (e.g. a (period x 1) column against arrays of loans)
+        """
+        periods = np.asarray(periods)
+        monthly_rate = Loan.monthly_rate(np.asarray(rate, dtype=float))
+        balance = cls.calc_balance_array(face, rate, term, periods)
+        payment = np.where((periods == 0) | cls.paid_off_array(term, periods), 0,
+                           cls.calc_monthly_pmt_array(face, rate, term))
+        payment = np.broadcast_to(payment, balance.shape)
+        interest = np.zeros_like(balance)
+        interest[1:] = np.broadcast_to(monthly_rate, balance.shape)[1:] * balance[:-1]
+        principal = payment - interest
+        return Schedule(payment, interest, principal, balance)
+
+    @classmethod
+    def calc_reset_schedule(cls, face, rates, term):
+        """
+        Calculates the Schedule for periods 0 to term + 1 of a loan whose rate can reset, given the rate of
+        each period. The state is stepped forward from one reset to the next: at each reset the payment is
+        recomputed from the balance outstanding and the remaining term, and each stretch between resets is
+        amortized in closed form. A fixed rate is a single stretch.
+        """
+        rates = np.asarray(rates, dtype=float)
+        payment = np.zeros(term + 2)
+        interest = np.zeros(term + 2)
+        balance = np.zeros(term + 2)
+        balance[0] = face
+        # periods 1..term where a new rate applies
+        starts = [1] + [n for n in range(2, term + 1) if rates[n] != rates[n - 1]]
+        ends = starts[1:] + [term + 1]
+        for start, end in zip(starts, ends):
+            remaining = term - start + 1
+            steps = np.arange(1, end - start + 1)
+            opening = balance[start - 1]
+            balance[start:end] = cls.calc_balance_array(opening, rates[start], remaining, steps)
+            payment[start:end] = cls.calc_monthly_pmt_array(opening, rates[start], remaining)
+        interest[1:] = Loan.monthly_rate(rates[1:]) * balance[:-1]
+        return Schedule(payment, interest, payment - interest, balance)
+
+    @classmethod
+    def calc_reset_schedule_array(cls, face, rates, term):
+        """
+        Calculates the Schedule of many loans whose rates can reset at once, given a (period x loan) matrix of
+        the rate of each loan in periods 0 to max term + 1. Steps through the periods for all loans together;
+        each period is amortized in closed form from the last reset, as in calc_reset_schedule.
+        """
+        face = np.asarray(face, dtype=float)
+        rates = np.asarray(rates, dtype=float)
+        term = np.asarray(term)
+        balance = np.zeros(rates.shape)
+        payment = np.zeros(rates.shape)
+        balance[0] = face
+        start = np.ones(face.shape, dtype=int)  # period the current rate applies from
+        opening = face.copy()  # balance when the current rate started
+        for n in range(1, len(rates)):
+            reset = (rates[n] != rates[n - 1]) & (n <= term) if n > 1 else np.ones(face.shape, dtype=bool)
+            start = np.where(reset, n, start)
+            opening = np.where(reset, balance[n - 1], opening)
+            remaining = term - start + 1
+            balance[n] = cls.calc_balance_array(opening, rates[n], remaining, n - start + 1)
+            payment[n] = np.where(n > term, 0, cls.calc_monthly_pmt_array(opening, rates[n], remaining))
+        interest = np.zeros(rates.shape)
+        interest[1:] = Loan.monthly_rate(rates[1:]) * balance[:-1]
+        return Schedule(payment, interest, payment - interest, balance)
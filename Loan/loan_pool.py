@@ -2,14 +2,23 @@
 This module contains the Loan Pool class
 """
 from Loan.loan_base import Loan
+from Loan.default_models import PiecewiseHazard, loan_columns
+from Loan.recovery_models import ConstantRecovery
 from functools import reduce
+from Diagnostics.diagnostics import get_diagnostics
 import numpy as np
 
+diagnostics = get_diagnostics(__name__)
+
 
 class LoanPool(object):
-    def __init__(self, loans):  # loans parameter is a list of loan objects
+    def __init__(self, loans, default_model=None, recovery_model=None):  # loans parameter is a list of loan objects
         self._loans = loans
         self._recoveries = {}
+        # the piecewise hazard table and 60% recovery unless other models are given
+        self._default_model = PiecewiseHazard() if default_model is None else default_model
+        self._recovery_model = ConstantRecovery() if recovery_model is None else recovery_model
+        self._columns = None
 
     def __iter__(self):
         """Returns the Iterator object"""
@@ -24,12 +33,29 @@ class LoanPool(object):
     @loans.setter
     def loans(self, iloans):
         self._loans = iloans
+        self._columns = None
+
+    @property
+    def default_model(self):
+        return self._default_model
+
+    @default_model.setter
+    def default_model(self, idefault_model):
+        self._default_model = idefault_model
+
+    @property
+    def recovery_model(self):
+        return self._recovery_model
+
+    @recovery_model.setter
+    def recovery_model(self, irecovery_model):
+        self._recovery_model = irecovery_model
 
     def active_loans(self, n):
         """Returns the number of active loans at a given period"""
         active = 0
         for i in self._loans:
-            if i.balance(n) > 0:
+            if i.is_active(n):
                 active += 1
         return active
 
@@ -86,16 +112,42 @@ class LoanPool(object):
         return [period, self.principal_due(period), self.interest_due(period),
                 self.payment_due(period), self._recoveries[period], self.balance(period)]
 
-    def check_defaults(self, period):
-        time_periods = [10, 60, 120, 180, 210, 360]
-        probabilities = [0.0005, 0.001, 0.002, 0.004, 0.002, 0.001]
-        index = sum([period > r for r in time_periods])  # (10, 60], (120, 180]
-        numbers = np.random.randint(0, 1 / probabilities[index], len(self._loans))  # list of random numbers
-        recoveries = sum([loan.check_default(period, number) for loan, number in zip(self._loans, numbers)])
+    def columns(self):
+        """
+        Returns the loan rates, notionals, asset values and asset depreciation as arrays for the default and
+        recovery models. Collected once and kept until the loans are replaced, added to or the pool is reset.
+        """
+        if self._columns is None or len(self._columns['rates']) != len(self._loans):
+            self._columns = loan_columns(self._loans)
+        return self._columns
+
+    def hazard(self, periods):
+        """
+        Returns the monthly default probabilities of the default model for an array of periods, as a
+        (period x loan) array or a (period x 1) column for pool level models
+        """
+        return self._default_model.default_probabilities(np.asarray(periods), self)
+
+    def _draw_defaults(self, period, num_loans, rng):
+        """Draws one random integer per loan; a loan defaults in the period when its number is 0"""
+        probabilities = self.hazard(np.array([period]))[0]
+        high = (1 / probabilities).astype(np.int64)  # numbers are drawn from 0 to high - 1
+        return rng.integers(0, high.item() if high.size == 1 else high, num_loans)
+
+    def check_defaults(self, period, rng=None):
+        """Draws the defaults for a period from the random Generator rng (a fresh unseeded one if not given)"""
+        if rng is None:
+            rng = np.random.default_rng()
+        numbers = self._draw_defaults(period, len(self._loans), rng)  # list of random numbers
+        recoveries = sum([loan.check_default(period, number, self._recovery_model)
+                          for loan, number in zip(self._loans, numbers)])
         self._recoveries[period] = recoveries
+        if diagnostics.enabled:
+            diagnostics.log('Recoveries at period %s are %s', period, recoveries)
         return recoveries
 
     def reset(self):
         """Reset the loans in the loan pool"""
         for i in self._loans:
-            i.reset()
\ No newline at end of file
+            i.reset()
+        self._columns = None  # the loans may have been changed between simulations
\ No newline at end of file
@@ -0,0 +1,101 @@
+"""
+This module contains the loan class registry and the Loan Tape Loader which streams a csv loan tape
+into a ColumnarLoanPool
+"""
+import csv
+import time
+import logging
+from itertools import islice
+import numpy as np
+from Loan.auto_loan import AutoLoan
+from Loan.columnar_pool import ColumnarLoanPool
+from Asset.cars import Car
+
+loan_dict = {'Auto Loan': AutoLoan,
+             'Car': Car}
+
+
+class LoanTapeLoader(object):
+    """
+    Reads a csv loan tape chunk_size rows at a time straight into typed column arrays, without creating a
+    Loan or Asset object per row. Loan Type and Asset names are resolved through the loan class registry.
+    """
+
+    def __init__(self, filename, chunk_size=100000, registry=None):
+        self._filename = filename
+        self._chunk_size = chunk_size
+        self._registry = loan_dict if registry is None else registry
+        self._rows = 0
+        self._seconds = 0
+
+    @property
+    def rows(self):
+        return self._rows
+
+    @property
+    def seconds(self):
+        return self._seconds
+
+    @property
+    def rows_per_second(self):
+        return self._rows / self._seconds if self._seconds else 0
+
+    def _classes(self, loan_type, asset_name):
+        """Looks up the loan and asset classes for a row type in the registry"""
+        loan_class = self._registry.get(loan_type)
+        asset_class = self._registry.get(asset_name)
+        if loan_class is None or asset_class is None:
+            logging.error(f'Error: Loan Type {loan_type} or Asset {asset_name} is not in the loan registry')
+            raise ValueError(f'Unknown Loan Type {loan_type} or Asset {asset_name}')
+        return loan_class, asset_class
+
+    def chunks(self):
+        """Yields the tape as dicts of column arrays, chunk_size rows at a time"""
+        with open(self._filename, newline='') as file:
+            reader = csv.reader(file)
+            header = next(reader)
+            index = [header.index(name) for name in ('Loan Type', 'Asset', 'Balance', 'Rate', 'Term', 'Asset Value')]
+            while True:
+                rows = list(islice(reader, self._chunk_size))
+                if not rows:
+                    return
+                loan_types, assets, balances, rates, terms, asset_values = zip(*([row[i] for i in index]
+                                                                                 for row in rows))
+                yield {'loan_type': np.array(loan_types), 'asset': np.array(assets),
+                       'notional': np.array(balances, dtype=float), 'rate': np.array(rates, dtype=float),
+                       'term': np.array(terms, dtype=float).astype(np.int32),
+                       'asset_value': np.array(asset_values, dtype=float)}
+
+    def load(self):
+        """Streams the whole tape into a ColumnarLoanPool and records the load speed"""
+        start = time.perf_counter()
+        classes = {}  # (loan class, asset class) -> class code
+        columns = {'notional': [], 'rate': [], 'term': [], 'asset_value': [], 'depreciation': [], 'code': []}
+
+        for chunk in self.chunks():
+            # resolve each distinct (Loan Type, Asset) pair of the chunk once
+            types, inverse = np.unique(np.stack([chunk['loan_type'], chunk['asset']], axis=1), axis=0,
+                                       return_inverse=True)
+            codes = np.empty(len(types), dtype=np.int16)
+            type_depreciation = np.empty(len(types))
+            for i, (loan_type, asset_name) in enumerate(types):
+                loan_class, asset_class = self._classes(loan_type, asset_name)
+                codes[i] = classes.setdefault((loan_class, asset_class), len(classes))
+                type_depreciation[i] = asset_class.class_depreciation()
+            inverse = inverse.reshape(-1)
+
+            columns['notional'].append(chunk['notional'])
+            columns['rate'].append(chunk['rate'])
+            columns['term'].append(chunk['term'])
+            columns['asset_value'].append(chunk['asset_value'])
+            columns['depreciation'].append(type_depreciation[inverse])
+            columns['code'].append(codes[inverse])
+
+        columns = {name: np.concatenate(arrays) if arrays else np.array([]) for name, arrays in columns.items()}
+        pool = ColumnarLoanPool.from_columns(columns['notional'], columns['rate'], columns['term'],
+                                             columns['asset_value'], columns['depreciation'], columns['code'],
+                                             list(classes))
+        self._rows = len(columns['notional'])
+        self._seconds = time.perf_counter() - start
+        logging.info(f'Loaded {self._rows} loans from {self._filename} at {self.rows_per_second:.0f} rows/sec')
+        return pool
@@ -2,22 +2,24 @@
 This module contains the derived Loan classes
 """
 from Loan.loan_base import Loan
+from bisect import bisect_right
+import logging
+import numpy as np
 
 
 class FixedRateLoan(Loan):
-    pass
+    __slots__ = ()
 
 
 class VariableRateLoan(Loan):
-    def __init__(self, notional, rate_dict, start_date, end_date, asset):
-        super(VariableRateLoan, self).__init__(notional, None, start_date, end_date, asset)  # calls the base class
-        # initialization
-        if not isinstance(rate_dict, dict):
-            print("Error: Rate parameter is not a dictionary")
-        elif not all(rate_dict.values()):
-            print("Error: Rates cannot be 0. Please enter correct rates")
-        else:
-            self._rate_dict = rate_dict
+    __slots__ = ('_rate_dict', '_rate_periods', '_rate_values', '_rate_array')
+
+    def __init__(self, notional, rate_dict, term, asset):
+        self._check_rates(rate_dict)
+        # the base class rate is the rate of the first period in the rate dictionary
+        super(VariableRateLoan, self).__init__(notional, rate_dict[min(rate_dict)], term, asset)
+        self._rate_dict = rate_dict
+        self._compile_rates()
 
     #
     @property
@@ -28,18 +30,37 @@ class VariableRateLoan(Loan):
     # checking if rate dictionary is actually a dictionary
     @rate_dict.setter
     def rate_dict(self, irate):
-        if not isinstance(irate, dict):
-            print("Error: Rate parameter is not a dictionary")
-        elif not all(irate.values()):
-            print("Error: Rates cannot be 0. Please enter correct rates")
-        else:
-            self._rate_dict = irate
+        self._check_rates(irate)
+        self._rate = irate[min(irate)]
+        self._rate_dict = irate
+        self._compile_rates()
+        self._invalidate()
+
+    @staticmethod
+    def _check_rates(rate_dict):
+        """Raises if rate_dict is not a non-empty dictionary of {start period: non-zero rate}"""
+        if not isinstance(rate_dict, dict) or not rate_dict:
+            logging.error('Error: Rate parameter is not a dictionary')
+            raise TypeError('Rate parameter must be a dictionary of {start period: rate}')
+        elif not all(rate_dict.values()):
+            logging.error('Error: Rates cannot be 0')
+            raise ValueError('Rates cannot be 0. Please enter correct rates')
+
+    def _compile_rates(self):
+        """Compiles the rate dictionary into sorted start periods and their rates for the step lookup"""
+        self._rate_periods = sorted(self._rate_dict)
+        self._rate_values = [self._rate_dict[period] for period in self._rate_periods]
+        self._rate_array = np.array(self._rate_values, dtype=float)
 
     def get_rate(self, n=None):
-        """Overrides the get_rate method from the Loan base class"""
-        s_period = sorted([*self._rate_dict.keys()])  # created a sorted list of the periods from the rate dict
-        m = [period for period in s_period if period <= n]  # generates a list of the periods less than or equal to
-        # inputted period
-        p = max(m)
-        # returns the value for the key p
-        return self._rate_dict.get(p)
+        """
+        Overrides the get_rate method from the Loan base class: the rate of the latest start period at or
+        before n. Periods before the first start period get the first rate; n=None gives the first rate and
+        an array of periods gives an array of rates.
+        """
+        if n is None:
+            return self._rate_values[0]
+        if np.ndim(n) == 0:
+            return self._rate_values[max(0, bisect_right(self._rate_periods, n) - 1)]
+        index = np.searchsorted(self._rate_periods, n, side='right') - 1
+        return self._rate_array[np.maximum(index, 0)]
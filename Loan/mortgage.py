@@ -3,38 +3,57 @@ This module contains classes related to Mortgages
 """
 
 from Loan.loans import VariableRateLoan, FixedRateLoan
+from Loan.loan_base import Schedule
 from Asset.house_base import House
+from collections import namedtuple
+import numpy as np
+
+MortgageSchedule = namedtuple('MortgageSchedule', Schedule._fields + ('pmi',))
 
 
 class MortgageMixin(object):
-    def __init__(self, notional, rate, start_date, end_date, home):
+    __slots__ = ()
+    pmi_rate = 0.000075  # monthly PMI as a share of the notional
+    pmi_ltv = 0.8  # PMI is charged while the loan to value is at or above this
+
+    def __init__(self, notional, rate, term, home):
         if not isinstance(home, House):
             print("Error: home parameter is wrong class type")
-        else:
-            self._home = home
-        super(MortgageMixin, self).__init__(notional, rate, start_date, end_date, home)
+        super(MortgageMixin, self).__init__(notional, rate, term, home)
+
+    def _build_schedule(self):
+        """
+        Adds the PMI of each period to the amortization schedule. PMI is charged on top of the amortizing
+        payment while the balance at the start of the period is at least pmi_ltv of the home value
+        (assuming asset value = notional in this example); it does not pay down principal.
+        """
+        schedule = super(MortgageMixin, self)._build_schedule()
+        periods = np.arange(len(schedule.balance))
+        opening = np.concatenate(([0], schedule.balance[:-1]))
+        charged = (periods >= 1) & (periods <= self.term) & (opening / self._asset.initial_value >= self.pmi_ltv)
+        pmi = np.where(charged, self.pmi_rate * self._notional, 0)
+        return MortgageSchedule(schedule.payment + pmi, schedule.interest, schedule.principal, schedule.balance,
+                                pmi)
 
     def PMI(self, period):
         """Private Mortgage Insurance payment"""
-        # brings in balance from the loan base class
-        balance = super(MortgageMixin, self).balance(period)
-        # assuming asset value = notional in this example
-        LTV = balance / self._home.initial_value
-        return 0.000075 * self._notional if LTV >= 0.8 else 0
+        return self._scheduled('pmi', period)
 
     def monthly_payment(self, n=None):
         """Overrides the base monthly payment formula"""
-        return super(MortgageMixin, self).monthly_payment(n) + self.PMI(n)
+        if n is None:
+            return super(MortgageMixin, self).monthly_payment() + self.PMI(1)
+        return super(MortgageMixin, self).monthly_payment(n)
 
     def principal_due(self, n):
         """Overrides the base principal due formula"""
-        # PMI comes out of principal due since it is an extra payment
-        return super(MortgageMixin, self).principal_due(n) - self.PMI(n)
+        # PMI is an extra payment on top of the amortizing payment, so it is not principal
+        return self._scheduled('principal', n)
 
 
 class VariableMortgage(MortgageMixin, VariableRateLoan):
-    pass
+    __slots__ = ()
 
 
 class FixedMortgage(MortgageMixin, FixedRateLoan):
-    pass
+    __slots__ = ()
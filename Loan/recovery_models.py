@@ -0,0 +1,63 @@
+"""
+This module contains the recovery models, which give the share of the asset value recovered when a loan
+defaults
+"""
+import numpy as np
+from Asset.asset import Asset
+from Loan.default_models import loan_columns
+
+
+class RecoveryModel(object):
+    """Base class of the recovery models"""
+
+    def recovery_rates(self, periods, loans=None):
+        """Returns the recovery rates for an array of periods as a (period x loan) or (period x 1) array"""
+        raise NotImplementedError
+
+    def recovery_rate(self, period, loan=None):
+        """Returns the recovery rate of one loan defaulting in one period as a plain number"""
+        return self.recovery_rates(np.array([period]), None if loan is None else [loan])[0, 0].item()
+
+    def recovery(self, periods, loans, selection=None):
+        """
+        Returns the (period x loan) amounts recovered from loans defaulting in each of an array of periods,
+        for the subset of the loans picked by selection (a boolean mask or index array) if given
+        """
+        periods = np.asarray(periods)
+        columns = loan_columns(loans, selection)
+        values = Asset.values(columns['asset_values'], columns['asset_depreciation'], periods[:, None])
+        return values * self.recovery_rates(periods, columns)
+
+
+class ConstantRecovery(RecoveryModel):
+    """Recovers the same share of the asset value in every period"""
+
+    def __init__(self, rate=0.6):
+        self._rate = rate
+
+    @property
+    def rate(self):
+        return self._rate
+
+    def recovery_rates(self, periods, loans=None):
+        return np.full((len(periods), 1), self._rate)
+
+    def recovery_rate(self, period, loan=None):
+        return self._rate
+
+
+class RecoveryCurve(RecoveryModel):
+    """Recovers rates[n] of the asset value in period n; the last rate applies to later periods"""
+
+    def __init__(self, rates):
+        self._rates = np.asarray(rates, dtype=float)
+
+    @property
+    def rates(self):
+        return self._rates
+
+    def recovery_rates(self, periods, loans=None):
+        return self._rates[np.minimum(np.asarray(periods), len(self._rates) - 1)][:, None]
+
+    def recovery_rate(self, period, loan=None):
+        return self._rates[min(period, len(self._rates) - 1)].item()
@@ -0,0 +1,52 @@
+"""
+This module contains the variance reduction techniques used by the batched default simulation
+"""
+import numpy as np
+
+METHODS = (None, 'antithetic', 'latin_hypercube', 'importance')
+
+
+def draw_uniforms(rng, num_paths, num_loans, method=None):
+    """
+    Draws (path x loan) uniforms for the default simulation. 'antithetic' pairs every path u with a path
+    1 - u; 'latin_hypercube' draws exactly one uniform per 1 / num_paths stratum for each loan, with the
+    strata shuffled independently per loan. Other methods use plain independent uniforms.
+    """
+    if method not in METHODS:
+        raise ValueError(f'Unknown variance reduction method {method}')
+    if method == 'antithetic':
+        half = rng.random(((num_paths + 1) // 2, num_loans))
+        return np.concatenate([half, 1 - half])[:num_paths]
+    if method == 'latin_hypercube':
+        strata = rng.permuted(np.tile(np.arange(num_paths)[:, None], (1, num_loans)), axis=0)
+        return (strata + rng.random((num_paths, num_loans))) / num_paths
+    return rng.random((num_paths, num_loans))
+
+
+def tilt_hazard(hazard, tilt):
+    """Scales the monthly default probabilities up by tilt for importance sampling"""
+    return np.minimum(hazard * tilt, 1)
+
+
+def log_likelihood(default_period, terms, hazard):
+    """
+    Returns the (path x loan) log probability of each loan's simulated outcome under a hazard vector or
+    (period x loan) hazard array (hazard[k - 1] for period k): defaulting in its default period, or
+    surviving to its term
+    """
+    hazard = np.asarray(hazard)
+    if hazard.ndim == 1:
+        hazard = hazard[:, None]
+    loan = np.arange(hazard.shape[1]) if hazard.shape[1] > 1 else 0
+    # log probability of surviving periods 1 to k
+    log_survival = np.concatenate((np.zeros((1, hazard.shape[1])), np.cumsum(np.log1p(-hazard), axis=0)))
+    defaulted = default_period <= terms
+    period = np.where(defaulted, default_period, terms)
+    return np.where(defaulted, log_survival[period - 1, loan] + np.log(hazard[period - 1, loan]),
+                    log_survival[terms, loan])
+
+
+def log_likelihood_ratios(default_period, terms, hazard, sampling_hazard):
+    """Returns the log likelihood ratio of every path: the true hazard against the one it was sampled from"""
+    return (log_likelihood(default_period, terms, hazard) -
+            log_likelihood(default_period, terms, sampling_hazard)).sum(axis=1)
@@ -0,0 +1,155 @@
+"""
+This module contains the solvers for the tranche rate fixed point of the Monte Carlo: each round the
+simulation turns the current tranche rates into yields, and the solver proposes the next rates. Each round
+costs a full simulation, so the solvers try to need as few rounds as possible.
+"""
+import numpy as np
+
+
+class RateSolver(object):
+    """
+    Base class of the rate solvers. The relaxation coefficient of each tranche damps the step towards the
+    yield, new rate = rate + coefficient * (yield - rate). Tranches whose yield is NaN keep their rate.
+    Every round is recorded in history.
+    """
+
+    def __init__(self, coefficients):
+        self._coefficients = np.asarray(coefficients, dtype=float)
+        self.reset()
+
+    @property
+    def coefficients(self):
+        return self._coefficients
+
+    @property
+    def history(self):
+        """List of one dict per round with the rates, yields, next rates and convergence difference"""
+        return self._history
+
+    @property
+    def rounds(self):
+        return len(self._history)
+
+    def reset(self):
+        """Clears the history so the solver can be used for a new fixed point"""
+        self._history = []
+
+    def next_rates(self, rates, yields):
+        """Returns the rates for the next round given the rates of this round and the yields they produced"""
+        rates = np.asarray(rates, dtype=float)
+        yields = np.asarray(yields, dtype=float)
+        new_rates = self._step(rates, np.where(np.isnan(yields), rates, yields))
+        new_rates = np.where(np.isfinite(new_rates), new_rates, rates)
+        self._history.append({'round': len(self._history) + 1, 'rates': rates, 'yields': yields,
+                              'new_rates': new_rates})
+        return new_rates
+
+    def record_difference(self, difference):
+        """Adds the convergence difference of the last round to the history"""
+        self._history[-1]['difference'] = difference
+
+    def _step(self, rates, yields):
+        raise NotImplementedError
+
+
+class RelaxationSolver(RateSolver):
+    """Fixed-point relaxation with the constant coefficient of each tranche"""
+
+    def _step(self, rates, yields):
+        return rates + self._coefficients * (yields - rates)
+
+
+class AdaptiveRelaxationSolver(RateSolver):
+    """
+    Relaxation whose coefficient per tranche grows by grow while the residual (yield - rate) keeps its sign
+    and shrinks by shrink when it flips sign, i.e. when the rate overshoots
+    """
+
+    def __init__(self, coefficients, grow=1.5, shrink=0.5, max_coefficient=4.0):
+        super(AdaptiveRelaxationSolver, self).__init__(coefficients)
+        self._grow = grow
+        self._shrink = shrink
+        self._max_coefficient = max_coefficient
+
+    def reset(self):
+        super(AdaptiveRelaxationSolver, self).reset()
+        self._current = self._coefficients.copy()
+        self._last_residual = None
+
+    def _step(self, rates, yields):
+        residual = yields - rates
+        if self._last_residual is not None:
+            same_sign = np.sign(residual) == np.sign(self._last_residual)
+            self._current = np.minimum(np.where(same_sign, self._current * self._grow, self._current * self._shrink),
+                                       self._max_coefficient)
+        self._last_residual = residual
+        return rates + self._current * residual
+
+
+class SecantSolver(RateSolver):
+    """
+    Secant steps on the residual (yield - rate) of each tranche (a diagonal Broyden update), starting with a
+    relaxation step and falling back to relaxation when the residual did not change. Works best with
+    common random numbers, since the secant slope is taken between two simulation rounds.
+    """
+
+    def reset(self):
+        super(SecantSolver, self).reset()
+        self._last = None
+
+    def _step(self, rates, yields):
+        residual = yields - rates
+        relaxed = rates + self._coefficients * residual
+        if self._last is None:
+            new_rates = relaxed
+        else:
+            last_rates, last_residual = self._last
+            change = residual - last_residual
+            with np.errstate(divide='ignore', invalid='ignore'):
+                secant = rates - residual * (rates - last_rates) / change
+            new_rates = np.where(change != 0, secant, relaxed)
+        self._last = (rates, residual)
+        return new_rates
+
+
+class AndersonSolver(RateSolver):
+    """
+    Anderson acceleration of the relaxation: the next rates combine the last depth + 1 relaxation steps
+    with the weights that minimise the combined residual
+    """
+
+    def __init__(self, coefficients, depth=3):
+        super(AndersonSolver, self).__init__(coefficients)
+        self._depth = depth
+
+    def reset(self):
+        super(AndersonSolver, self).reset()
+        self._rates = []
+        self._residuals = []
+
+    def _step(self, rates, yields):
+        residual = yields - rates
+        self._rates = (self._rates + [rates])[-(self._depth + 1):]
+        self._residuals = (self._residuals + [residual])[-(self._depth + 1):]
+        relaxed = rates + self._coefficients * residual
+        if len(self._rates) == 1:
+            return relaxed
+        rate_changes = np.diff(np.array(self._rates), axis=0).T  # (tranche x depth)
+        residual_changes = np.diff(np.array(self._residuals), axis=0).T
+        gamma = np.linalg.lstsq(residual_changes, residual, rcond=None)[0]
+        return relaxed - (rate_changes + self._coefficients[:, None] * residual_changes) @ gamma
+
+
+SOLVERS = {'relaxation': RelaxationSolver,
+           'adaptive': AdaptiveRelaxationSolver,
+           'secant': SecantSolver,
+           'anderson': AndersonSolver}
+
+
+def get_solver(solver, coefficients):
+    """Returns a solver instance for a solver name, or the solver itself if it is already one"""
+    if isinstance(solver, RateSolver):
+        return solver
+    if solver not in SOLVERS:
+        raise ValueError(f'Unknown rate solver {solver}; expected one of {list(SOLVERS)}')
+    return SOLVERS[solver](coefficients)
@@ -1,51 +1,169 @@
 """This script contains the Monte Carlo function"""
-from Simulations.sim_waterfall import simulate_waterfall
-from Simulations.sim_waterfall_parallel import simulate_waterfall_parallel
+from Simulations.sim_waterfall import simulate_liabilities, simulate_waterfall_adaptive
+from Simulations.sim_waterfall_parallel import WaterfallPool
+from Loan.asset_paths import AssetPaths
+from Simulations.rate_solvers import get_solver
+from Tranche.ratings import rating
+import os
+import hashlib
+import logging
 import numpy as np
 
+default_coefficients = [1.2, 0.8]  # relaxation coefficients of the senior tranche and of the others
 
-def run_monte(loanpool, structuredsecurity, tolerance, num_sim, num_processes):
-    """Runs the Monte Carlo simulation"""
+
+def run_monte(loanpool, structuredsecurity, tolerance, num_sim, num_processes, seed=None, common_paths=False,
+              paths_file=None, dirr_width=None, al_width=None, pool_dir=None, solver='relaxation',
+              max_iterations=100):
+    """
+    Runs the Monte Carlo simulation. Each iteration draws from its own random stream spawned from seed.
+
+    The tranche rates are iterated to the fixed point where they equal the simulated yields by solver: a
+    name from rate_solvers.SOLVERS ('relaxation', 'adaptive', 'secant', 'anderson'), built with the tranche
+    coefficients (see tranche_coefficients), or a RateSolver instance whose history then shows every
+    simulation round. Iterations stop once the rates change by less than tolerance, or after max_iterations.
+
+    With common_paths the loan pool (a ColumnarLoanPool) defaults are simulated once and every iteration only
+    re-runs the tranche waterfall on the same paths. The paths are read from paths_file if it was saved
+    with the same num_sim, seed and loan pool, and simulated and saved to it otherwise.
+
+    With dirr_width and/or al_width each iteration stops adding paths on a ColumnarLoanPool once the
+    confidence intervals of the tranche DIRR/AL means are that narrow, running at most num_sim paths. These
+    batches run in this process, so num_processes must be 1.
+
+    With pool_dir the worker processes memory-map a ColumnarLoanPool saved there instead of each
+    receiving a pickled copy.
+    """
     old_rates = structuredsecurity.get_rates()
     tranche_notionals = structuredsecurity.get_notionals()
-    tranche_coeffs = [1.2, 0.8]  # should be a property in tranche class but given here for now
+    solver = get_solver(solver, tranche_coefficients(structuredsecurity))
     diff = tolerance * 2  # start of diff as greater than tolerance
     dirrs = None
     als = None
     irrs = None
+    seed_sequence = np.random.SeedSequence(seed)
+
+    paths = None
+    pool = None
+    adaptive = not common_paths and (dirr_width is not None or al_width is not None)
+    if adaptive and num_processes != 1:
+        logging.error(f'Error: num_processes is {num_processes} but the adaptive path budget runs in one process')
+        raise ValueError('num_processes must be 1 with dirr_width or al_width')
+    capped_tranches = set()  # tranches that needed every path in some iteration
+    if common_paths:
+        paths = get_asset_paths(loanpool, num_sim, seed_sequence, paths_file)
+    elif not adaptive:
+        # the workers load the loan pool once and only receive the tranche rates of each iteration
+        pool = WaterfallPool(loanpool, structuredsecurity, num_processes, pool_dir)
 
-    while diff > tolerance:
-        # dirrs, als, irrs = simulate_waterfall(loanpool, structuredsecurity, num_sim)
-        dirrs, als, irrs = simulate_waterfall_parallel(loanpool, structuredsecurity, num_sim, num_processes)
-        yield_rates = [calculate_yield(d, a) for d, a in zip(dirrs, als)]
-        new_rates = [new_tranche_rate(o, y, c) for o, y, c in zip(old_rates, yield_rates, tranche_coeffs)]
-        diff = calculate_difference(old_rates, new_rates, tranche_notionals)
-        old_rates = new_rates  # replace old rates with new rates for loop
+    try:
+        while diff > tolerance and solver.rounds < max_iterations:
+            if paths is not None:
+                dirrs, als, irrs = simulate_liabilities(paths, structuredsecurity, old_rates)
+            elif pool is not None:
+                # dirrs, als, irrs = simulate_waterfall(loanpool, structuredsecurity, num_sim)
+                dirrs, als, irrs = pool.simulate(old_rates, num_sim, seed_sequence.spawn(1)[0])
+            else:
+                dirrs, als, irrs, paths_needed = simulate_waterfall_adaptive(
+                    loanpool, structuredsecurity, dirr_width, al_width, num_sim, seed=seed_sequence.spawn(1)[0],
+                    rates=old_rates, warn=False)
+                logging.info(f'Paths needed per tranche: {paths_needed}')
+                capped_tranches.update(np.flatnonzero(paths_needed >= num_sim).tolist())
+            yield_rates = [calculate_yield(d, a) for d, a in zip(dirrs, als)]
+            new_rates = list(solver.next_rates(old_rates, yield_rates))
+            # tranches without a yield (e.g. AL is NaN when principal is not paid down) keep their rate and
+            # are left out of the convergence test
+            diff = calculate_difference(old_rates, np.where(np.isnan(yield_rates), np.nan, new_rates),
+                                        tranche_notionals)
+            solver.record_difference(diff)
+            if np.isnan(diff):
+                logging.warning('No tranche has a simulated yield; the tranche rates are left unchanged')
+            old_rates = new_rates  # replace old rates with new rates for loop
+    finally:
+        if pool is not None:
+            pool.close()
 
+    if capped_tranches:
+        logging.warning(f'Tranches {sorted(capped_tranches)} used all {num_sim} paths in some iterations without '
+                        f'reaching the confidence widths')
+    if diff > tolerance:
+        logging.warning(f'Tranche rates did not converge to {tolerance} in {max_iterations} iterations')
+    logging.info(f'Tranche rates found in {solver.rounds} simulation rounds')
     tranche_ratings = [get_rating(d) for d in dirrs]
 
     return [dirrs, als, tranche_ratings, irrs]
 
 
+def get_asset_paths(loanpool, num_sim, seed, paths_file=None):
+    """
+    Simulates the loan pool AssetPaths once, or loads them from paths_file if they were saved there with the
+    same num_sim, seed and loan pool. Paths from an unseeded run are never reused.
+    """
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    metadata = paths_metadata(loanpool, num_sim, seed)
+    if paths_file is not None and os.path.exists(paths_file):
+        saved = AssetPaths.load_metadata(paths_file)
+        if saved.keys() == metadata.keys() and all(np.array_equal(saved[name], value)
+                                                   for name, value in metadata.items()):
+            return AssetPaths.load(paths_file)
+        logging.info(f'{paths_file} was simulated with other settings; simulating the paths again')
+    paths = loanpool.simulate_defaults(num_sim, rng=np.random.default_rng(seed))
+    if paths_file is not None:
+        paths.save(paths_file, metadata)
+    return paths
+
+
+def paths_metadata(loanpool, num_sim, seed):
+    """
+    Returns the settings simulated paths depend on: num_sim, the SeedSequence seed, the loan pool shape and
+    hashes of the loan columns, the default model's hazard table and the recovery model's recovery table
+    """
+    horizon = len(loanpool.amortization()[0])
+    columns = [loanpool.notionals, loanpool.rates, loanpool.terms, loanpool.asset_values,
+               loanpool.asset_depreciation, loanpool.variable_index, loanpool.rate_matrix]
+    return {'num_sim': num_sim, 'seed': f'{seed.entropy}:{seed.spawn_key}',
+            'pool': np.array([len(loanpool.notionals), horizon, loanpool.total_principal()]),
+            'columns': array_digest(*columns),
+            'hazard': array_digest(loanpool.hazard(np.arange(1, horizon))),
+            'recovery': array_digest(loanpool.recovery_values())}
+
+
+def array_digest(*arrays):
+    """Returns a SHA-256 hex digest of the dtype, shape and contents of the arrays (None counts as empty)"""
+    digest = hashlib.sha256()
+    for array in arrays:
+        array = np.ascontiguousarray(np.array([]) if array is None else array)
+        digest.update(f'{array.dtype.str}{array.shape}'.encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def tranche_coefficients(structuredsecurity):
+    """
+    Returns the relaxation coefficient of each tranche; tranches without one get the default coefficients,
+    1.2 for the senior tranche and 0.8 for the others
+    """
+    return [default_coefficients[min(i, len(default_coefficients) - 1)] if coefficient is None else coefficient
+            for i, coefficient in enumerate(structuredsecurity.get_coefficients())]
+
+
 def calculate_yield(dirr, al):
     yield_rate = ((7 / (1 + .08 * np.exp(-0.19 * al / 12))) + 0.19 * np.sqrt(al / 12 * dirr * 100)) / 100
     return yield_rate
 
 
-def new_tranche_rate(old_rate, yield_rate, coefficient):
-    """Calculates new rate based on relaxation"""
-    return old_rate + coefficient * (yield_rate - old_rate)
-
-
 def calculate_difference(old_rates, new_rates, notionals):
-    difference = [(old - new) / old for old, new in zip(old_rates, new_rates)]
-    return np.average(difference, weights=notionals)
+    """
+    Returns the notional weighted average absolute relative change of the tranche rates, over the tranches
+    whose rates are known (not NaN)
+    """
+    difference = np.abs((np.asarray(old_rates) - np.asarray(new_rates)) / np.asarray(old_rates))
+    known = ~np.isnan(difference)
+    if not known.any():
+        return np.nan
+    return np.average(difference[known], weights=np.asarray(notionals)[known])
 
 
 def get_rating(dirr):
-    DIRR_bps = np.array([-np.inf, 0.06, 0.67, 1.3, 2.7, 5.2, 8.9, 13, 19,
-                         27, 46, 72, 106, 143, 183, 231, 311, 2500, 10000])
-    letter_ratings = ["Aaa", "Aa1", "Aa2", "Aa3", "A1", "A2", "A3", "Baa1", "Baa2",
-                      "Baa3", "Ba1", "Ba2", "Ba3", "B1", "B2", "B3", "Caa", "Ca"]
-    index = np.where(DIRR_bps >= dirr * 10000.0)[0][0] - 1
-    return letter_ratings[index]
+    return rating(dirr)
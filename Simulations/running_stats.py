@@ -0,0 +1,57 @@
+"""This module contains the Running Stats class used to stream Monte Carlo estimates"""
+from statistics import NormalDist
+import numpy as np
+
+
+class RunningStats(object):
+    """
+    Running mean and variance of one metric per tranche, updated a batch of paths at a time. A NaN
+    observation (e.g. AL of a tranche that is not paid down) makes the tranche mean NaN, as np.mean does
+    for the fixed path count simulations.
+    """
+
+    def __init__(self, num_tranches):
+        self._count = np.zeros(num_tranches)
+        self._mean = np.zeros(num_tranches)
+        self._m2 = np.zeros(num_tranches)  # sum of squared deviations from the mean
+        self._has_nan = np.zeros(num_tranches, dtype=bool)
+
+    @property
+    def count(self):
+        return self._count
+
+    @property
+    def has_nan(self):
+        """True for tranches with a NaN observation, whose mean is NaN however many paths are added"""
+        return self._has_nan
+
+    @property
+    def mean(self):
+        return np.where((self._count > 0) & ~self._has_nan, self._mean, np.nan)
+
+    def update(self, batch):
+        """Adds a (tranche x path) batch of observations, merging batch statistics into the running ones"""
+        valid = ~np.isnan(batch)
+        self._has_nan |= ~valid.all(axis=1)
+        batch_count = valid.sum(axis=1)
+        batch_sum = np.where(valid, batch, 0).sum(axis=1)
+        batch_mean = np.divide(batch_sum, batch_count, out=np.zeros(len(batch_count)), where=batch_count > 0)
+        batch_m2 = np.where(valid, (batch - batch_mean[:, None]) ** 2, 0).sum(axis=1)
+
+        total = self._count + batch_count
+        delta = batch_mean - self._mean
+        ratio = np.divide(batch_count, total, out=np.zeros(len(total)), where=total > 0)
+        self._mean = self._mean + delta * ratio
+        self._m2 = self._m2 + batch_m2 + delta ** 2 * self._count * ratio
+        self._count = total
+
+    def std_error(self):
+        """Returns the standard error of the mean, NaN until a tranche has two observations or once it has a NaN"""
+        variance = np.divide(self._m2, self._count - 1, out=np.full(len(self._count), np.nan),
+                             where=(self._count > 1) & ~self._has_nan)
+        return np.sqrt(variance / np.maximum(self._count, 1))
+
+    def interval_width(self, confidence=0.95):
+        """Returns the full width of the normal confidence interval of the mean"""
+        z = NormalDist().inv_cdf((1 + confidence) / 2)
+        return 2 * z * self.std_error()
@@ -0,0 +1,170 @@
+"""
+This script contains the scenario grid runner, which values many tranche structures under many default and
+recovery assumptions in one job
+"""
+from itertools import product
+from string import ascii_uppercase
+import csv
+import logging
+import multiprocessing
+import numpy as np
+from Loan.asset_paths import AssetPaths
+from Loan.default_models import DefaultModel
+from Loan.recovery_models import RecoveryModel, ConstantRecovery
+from Tranche.structured_security import StructuredSecurity
+from Tranche.ratings import rating
+from Simulations.sim_waterfall import simulate_liabilities
+from Simulations.sim_waterfall_parallel import init_worker, split_simulations, _worker_state
+
+RESULT_COLUMNS = ['scenario', 'default_curve', 'recovery_rate', 'mode', 'split', 'coupons', 'tranche',
+                  'notional_share', 'rate', 'dirr', 'al', 'irr', 'rating']
+
+
+def curve_hazard(loanpool, curve):
+    """
+    Returns the hazard (hazard[k - 1] for period k) of a default curve: None for the pool's default model,
+    a number to scale it by, a DefaultModel, or a vector of monthly default probabilities (the last one is
+    repeated up to the max term of the pool)
+    """
+    horizon = len(loanpool.amortization()[0]) - 1
+    periods = np.arange(1, horizon + 1)
+    if curve is None:
+        return loanpool.hazard(periods)
+    if isinstance(curve, DefaultModel):
+        return curve.default_probabilities(periods, loanpool)
+    if np.ndim(curve) == 0:
+        return np.minimum(loanpool.hazard(periods) * curve, 1)
+    curve = np.asarray(curve, dtype=float)
+    return np.concatenate((curve, np.full(max(0, horizon - len(curve)), curve[-1])))[:horizon]
+
+
+def recovery_models(loanpool, recovery_rates):
+    """
+    Returns a dict of recovery models by label for the recovery_rates of a scenario grid: None for the pool's
+    recovery model, a dict of labels to models or rates, or a sequence of models and rates. Rates become
+    ConstantRecovery models labelled by the rate; other models in a sequence are labelled by their class.
+    """
+    if recovery_rates is None:
+        recovery_rates = [loanpool.recovery_model]
+    if not isinstance(recovery_rates, dict):
+        recovery_rates = {recovery_label(rate): rate for rate in recovery_rates}
+    return {label: rate if isinstance(rate, RecoveryModel) else ConstantRecovery(float(rate))
+            for label, rate in recovery_rates.items()}
+
+
+def recovery_label(rate):
+    """Returns the results table label of a recovery rate or model"""
+    if isinstance(rate, ConstantRecovery):
+        return rate.rate
+    return type(rate).__name__ if isinstance(rate, RecoveryModel) else rate
+
+
+def scale_recoveries(paths, recovery_rate):
+    """Returns AssetPaths simulated with a recovery rate of 1 with their recoveries at recovery_rate"""
+    return AssetPaths(paths.principal, paths.interest, paths.recoveries * recovery_rate, paths.balance,
+                      paths.weights)
+
+
+def make_structure(total_notional, mode, split, coupons):
+    """Returns a StructuredSecurity with a tranche per split share and coupon, named A, B, ..."""
+    security = StructuredSecurity(total_notional, mode)
+    for subordination, share, coupon in zip(ascii_uppercase, split, coupons):
+        security.add_tranche(share, float(coupon), subordination)
+    return security
+
+
+def run_curve(curve, recovery_models, structures, num_sim, seed, loanpool=None):
+    """
+    Simulates num_sim paths of one default curve and values every (mode, split, coupons) structure under
+    every recovery model. Every model gets the same defaults: constant recovery rates rescale one simulation
+    recovering the whole asset value, other models are simulated again from the same seed. Returns
+    [dirrs, als, irrs] per recovery model and structure. Uses the worker's loan pool unless one is given.
+    """
+    if loanpool is None:
+        loanpool = _worker_state['loanpool']
+    hazard = curve_hazard(loanpool, curve)
+
+    def simulate(recovery_model):
+        """Simulates the paths of the curve with the recovery model"""
+        return loanpool.simulate_defaults(num_sim, rng=np.random.default_rng(seed), hazard=hazard,
+                                          recovery_model=recovery_model)
+
+    full_recovery = None
+    results = []
+    for recovery_model in recovery_models:
+        if isinstance(recovery_model, ConstantRecovery):
+            if full_recovery is None:
+                full_recovery = simulate(ConstantRecovery(1.0))
+            recovery_paths = scale_recoveries(full_recovery, recovery_model.rate)
+        else:
+            recovery_paths = simulate(recovery_model)
+        for mode, split, coupons in structures:
+            security = make_structure(loanpool.total_principal(), mode, split, coupons)
+            results.append(simulate_liabilities(recovery_paths, security))
+    return results
+
+
+def run_scenario_grid(loanpool, splits, coupons, modes=('Sequential',), default_curves=None,
+                      recovery_rates=None, num_sim=1000, num_processes=1, seed=None, pool_dir=None):
+    """
+    Values every combination of tranche split (tuple of notional shares), coupons (tuple of tranche rates;
+    each split is combined with the coupon tuples of the same length), waterfall mode, default curve and
+    recovery rate on a ColumnarLoanPool, and returns a tidy table: one dict per scenario and tranche with
+    the RESULT_COLUMNS.
+
+    default_curves maps a curve name to a curve for curve_hazard (None is the pool's hazard table).
+    recovery_rates are the recovery assumptions for recovery_models (None is the pool's recovery model).
+    Defaults are simulated once per default curve and shared by every structure and recovery rate; every
+    curve uses the same random numbers, so differences between curves are not simulation noise. With
+    num_processes > 1 the curves, split into chunks of paths, are run across worker processes, which load the
+    pool once (from pool_dir if given, as in WaterfallPool). A seeded grid reproduces for the same
+    num_processes.
+    """
+    if default_curves is None:
+        default_curves = {'base': None}
+    structures = [(mode, split, rates) for mode, split, rates in product(modes, splits, coupons)
+                  if len(split) == len(rates)]
+    if any(all(len(split) != len(rates) for rates in coupons) for split in splits):
+        logging.error('Error: a tranche split has no coupon list with one rate per tranche')
+        raise ValueError('Every split needs coupons with the same number of tranches')
+
+    chunks_per_curve = max(1, -(-num_processes // len(default_curves)))  # spread paths over spare processes
+    counts = [n for n in split_simulations(num_sim, chunks_per_curve) if n > 0]
+    seeds = np.random.SeedSequence(seed).spawn(len(counts))
+    recoveries = recovery_models(loanpool, recovery_rates)
+    tasks = [(curve, list(recoveries.values()), structures, n, s) for curve in default_curves.values()
+             for n, s in zip(counts, seeds)]
+
+    if num_processes > 1:
+        models = None
+        if pool_dir is not None:
+            loanpool.save(pool_dir)
+            models = (loanpool.default_model, loanpool.recovery_model)
+        with multiprocessing.Pool(num_processes, initializer=init_worker,
+                                  initargs=(loanpool if pool_dir is None else pool_dir, None, models)) as pool:
+            task_results = pool.starmap(run_curve, tasks)
+    else:
+        task_results = [run_curve(*task, loanpool=loanpool) for task in tasks]
+
+    rows = []
+    cases = list(product(recoveries, structures))
+    for c, curve_name in enumerate(default_curves):
+        chunk_results = task_results[c * len(counts):(c + 1) * len(counts)]
+        for k, (recovery_rate, (mode, split, rates)) in enumerate(cases):
+            # average the path chunks of the curve, weighted by their number of paths
+            dirrs, als, irrs = np.average(np.array([result[k] for result in chunk_results]), axis=0,
+                                          weights=counts)
+            for t, subordination in enumerate(ascii_uppercase[:len(split)]):
+                rows.append({'scenario': c * len(cases) + k, 'default_curve': curve_name,
+                             'recovery_rate': recovery_rate, 'mode': mode, 'split': split, 'coupons': rates,
+                             'tranche': subordination, 'notional_share': split[t], 'rate': rates[t],
+                             'dirr': dirrs[t], 'al': als[t], 'irr': irrs[t], 'rating': rating(dirrs[t])})
+    return rows
+
+
+def write_results(filename, rows):
+    """Writes the scenario grid results table to a csv file"""
+    with open(str(filename), 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=RESULT_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
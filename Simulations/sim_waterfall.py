@@ -1,27 +1,24 @@
 """This module contains the simulate waterfall function"""
 from waterfall import do_waterfall
+from Simulations.running_stats import RunningStats
 from statistics import mean
+import logging
 import numpy as np
 
 
-def simulate_waterfall(loanpool, structuredsecurity, num_sim):
-    dirr_sims = []
-    al_sims = []
-    irr_sims = []
+def simulate_waterfall(loanpool, structuredsecurity, num_sim, seed=None):
+    """Runs num_sim waterfalls with defaults drawn from a random Generator seeded with seed"""
+    rng = np.random.default_rng(seed)
+    metric_sims = []
 
     for i in range(num_sim):
         loanpool.reset()
         structuredsecurity.reset()
-        _, _, metrics = do_waterfall(loanpool, structuredsecurity)
-        metrics_transposed = np.array(metrics).T  # transpose metrics
-        irr_sims.append(metrics_transposed[0])
-        dirr_sims.append(metrics_transposed[1])
-        al_sims.append(metrics_transposed[2])
+        _, _, metrics = do_waterfall(loanpool, structuredsecurity, rng)
+        metric_sims.append(metrics)
 
-    # calculate averages
-    irr_average = np.mean(irr_sims, axis =0)
-    dirr_average = np.mean(dirr_sims, axis=0)
-    al_average = np.mean(al_sims, axis=0)
+    # calculate averages of the (simulation x tranche x metric) array
+    irr_average, dirr_average, al_average = np.mean(np.array(metric_sims), axis=0).T
     return [dirr_average, al_average, irr_average]
 
     # tranch_subs = [tranche.subordination for tranche in structuredsecurity.tranches]
@@ -37,3 +34,73 @@ def simulate_waterfall(loanpool, structuredsecurity, num_sim):
     #
     # for sub, als in tranche_al.items():
     #     al_averages[sub] = mean([x for x in als if x is not None])
+
+
+def simulate_waterfall_batched(loanpool, structuredsecurity, num_sim, seed=None, variance_reduction=None,
+                               tilt=1.1):
+    """
+    Simulates the defaults of every path at once on a ColumnarLoanPool and pays the tranches for all
+    paths with the batched waterfall. variance_reduction selects 'antithetic', 'latin_hypercube' or
+    'importance' (hazard scaled by tilt) default draws.
+    """
+    paths = loanpool.simulate_defaults(num_sim, rng=np.random.default_rng(seed),
+                                       variance_reduction=variance_reduction, tilt=tilt)
+    return simulate_liabilities(paths, structuredsecurity)
+
+
+def simulate_liabilities(paths, structuredsecurity, rates=None):
+    """
+    Pays the tranches on already simulated AssetPaths with the batched waterfall, at the tranche rates
+    unless rates are given, and averages the tranche metrics (weighted by the path weights of importance
+    sampled paths)
+    """
+    tranche_paths = structuredsecurity.make_payments_batched(paths.collections, paths.principal, rates)
+    irrs = tranche_paths.IRR()
+
+    # calculate averages
+    irr_average = np.average(irrs, axis=1, weights=paths.weights)
+    dirr_average = np.average(tranche_paths.DIRR(irrs), axis=1, weights=paths.weights)
+    al_average = np.average(tranche_paths.AL(), axis=1, weights=paths.weights)
+    return [dirr_average, al_average, irr_average]
+
+
+def simulate_waterfall_adaptive(loanpool, structuredsecurity, dirr_width, al_width, max_sim, confidence=0.95,
+                                batch_size=100, seed=None, rates=None, warn=True):
+    """
+    Adds batches of simulated paths on a ColumnarLoanPool until, for every tranche, the confidence intervals
+    of the mean DIRR and mean AL are narrower than dirr_width and al_width (None for no limit), or max_sim
+    paths have been run. A mean that is NaN (as in the fixed path count simulations) needs no more paths.
+    Returns the averages and the number of paths each tranche needed; tranches that did not converge report
+    the number of paths run, and are logged as a warning unless warn is False.
+    """
+    rng = np.random.default_rng(seed)
+    num_tranches = len(structuredsecurity.tranches)
+    irr_stats, dirr_stats, al_stats = RunningStats(num_tranches), RunningStats(num_tranches), RunningStats(num_tranches)
+    dirr_width = np.inf if dirr_width is None else dirr_width
+    al_width = np.inf if al_width is None else al_width
+    paths_needed = np.zeros(num_tranches, dtype=int)
+    converged = np.zeros(num_tranches, dtype=bool)
+    num_sim = 0
+
+    while num_sim < max_sim and not converged.all():
+        batch = min(batch_size, max_sim - num_sim)
+        paths = loanpool.simulate_defaults(batch, rng=rng)
+        tranche_paths = structuredsecurity.make_payments_batched(paths.collections, paths.principal, rates)
+        irrs = tranche_paths.IRR()
+        irr_stats.update(irrs)
+        dirr_stats.update(tranche_paths.DIRR(irrs))
+        al_stats.update(tranche_paths.AL())
+        num_sim += batch
+
+        # an interval is NaN (not converged) until a tranche has two observations of the metric; a NaN
+        # mean stays NaN whatever more paths are added
+        converged = ((dirr_width == np.inf) | dirr_stats.has_nan |
+                     (dirr_stats.interval_width(confidence) <= dirr_width)) & \
+                    ((al_width == np.inf) | al_stats.has_nan | (al_stats.interval_width(confidence) <= al_width))
+        paths_needed = np.where(converged, np.where(paths_needed == 0, num_sim, paths_needed), 0)
+
+    if warn and not converged.all():
+        logging.warning(f'Confidence width not reached for tranches {np.flatnonzero(~converged)} '
+                        f'after {num_sim} paths')
+    paths_needed = np.where(converged, paths_needed, num_sim)
+    return [dirr_stats.mean, al_stats.mean, irr_stats.mean, paths_needed]
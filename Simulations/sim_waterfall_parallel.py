@@ -1,49 +1,94 @@
 """This script contains code to parallelize the simulate waterfall function"""
 from Simulations.sim_waterfall import simulate_waterfall
+from Loan.columnar_pool import ColumnarLoanPool
 import multiprocessing
 import numpy as np
 
+_worker_state = {}  # loan pool and structured security loaded once into each worker process
 
-def do_work(input, output):
-    """Generic function that takes an input function and argument and runs it"""
-    while True:
-        try:
-            f, args = input.get(timeout=1)
-            results = f(*args)
-            output.put(results)
-        except:
-            break
 
+def init_worker(loanpool, structuredsecurity, models=None):
+    """
+    Stores the loan pool and structured security in the worker process. A directory name instead of a loan
+    pool memory-maps a ColumnarLoanPool saved there; only its columns are saved, so models gives the
+    (default model, recovery model) of the pool.
+    """
+    if isinstance(loanpool, str):
+        loanpool = ColumnarLoanPool.load(loanpool, mmap_mode='r')
+        if models is not None:
+            loanpool.default_model, loanpool.recovery_model = models
+    _worker_state['loanpool'] = loanpool
+    _worker_state['structuredsecurity'] = structuredsecurity
 
-def simulate_waterfall_parallel(loanpool, structuredsecurity, num_sim, num_processes):
-    """Runs waterfall in parallel processes"""
-    input_queue = multiprocessing.Queue()
-    output_queue = multiprocessing.Queue()
-    sub_sims = int(num_sim / num_processes)
 
-    for i in range(num_processes):
-        input_queue.put((simulate_waterfall, (loanpool, structuredsecurity, sub_sims)))
+def do_work(rates, num_sim, seed):
+    """Runs the waterfall simulation in the worker with the given tranche rates and random seed"""
+    structuredsecurity = _worker_state['structuredsecurity']
+    for tranche, rate in zip(structuredsecurity.tranches, rates):
+        tranche.rate = rate
+    return np.array(simulate_waterfall(_worker_state['loanpool'], structuredsecurity, num_sim, seed))
 
-    processes = []
-    for i in range(num_processes):
-        p = multiprocessing.Process(target=do_work, args=(input_queue, output_queue))
-        processes.append(p)
-        p.start()
 
-    results = []
+def split_simulations(num_sim, num_chunks):
+    """Splits num_sim into num_chunks counts that differ by at most one and add up to num_sim exactly"""
+    base, remainder = divmod(num_sim, num_chunks)
+    return [base + 1 if i < remainder else base for i in range(num_chunks)]
 
-    while len(results) != num_processes:
-        r = output_queue.get()
-        r = np.array(r)
-        results.append(r)
 
-    for p in processes:
-        p.terminate()
+class WaterfallPool(object):
+    """
+    Persistent pool of worker processes for the waterfall simulation. The loan pool and structured security
+    are sent to each worker once when the pool starts; each simulation only sends the tranche rates.
+    With pool_dir a ColumnarLoanPool is saved there once and every worker memory-maps the same files
+    instead of receiving a pickled copy.
+    """
 
-    res_sum = 0
-    for i in range(len(results)):
-        res_sum += results[i]
+    def __init__(self, loanpool, structuredsecurity, num_processes, pool_dir=None):
+        self._num_processes = num_processes
+        models = None
+        if pool_dir is not None:
+            loanpool.save(pool_dir)
+            models = (loanpool.default_model, loanpool.recovery_model)
+            loanpool = pool_dir
+        self._pool = multiprocessing.Pool(num_processes, initializer=init_worker,
+                                          initargs=(loanpool, structuredsecurity, models))
 
-    res_average = res_sum / num_processes
+    @property
+    def num_processes(self):
+        return self._num_processes
 
-    return [res_average[0], res_average[1], res_average[2]]  # match output to sim waterfall to keep the code the same
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Stops the worker processes"""
+        self._pool.terminate()
+        self._pool.join()
+
+    def simulate(self, rates, num_sim, seed=None):
+        """
+        Runs num_sim waterfall simulations across the workers and averages them. Each chunk of simulations
+        gets its own independent random stream spawned from seed, so the results are the same on rerun
+        whichever worker runs the chunk.
+        """
+        counts = [n for n in split_simulations(num_sim, self._num_processes) if n > 0]
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        seeds = seed.spawn(len(counts))
+        results = self._pool.starmap(do_work, [(rates, n, s) for n, s in zip(counts, seeds)])
+        res_average = np.average(np.array(results), axis=0, weights=counts)
+        return [res_average[0], res_average[1], res_average[2]]  # match output to sim waterfall
+
+
+def simulate_waterfall_parallel(loanpool, structuredsecurity, num_sim, num_processes, pool=None, seed=None):
+    """
+    Runs waterfall in parallel processes. Pass a running WaterfallPool to reuse its workers, otherwise a pool
+    is started and stopped for this call.
+    """
+    if pool is not None:
+        return pool.simulate(structuredsecurity.get_rates(), num_sim, seed)
+    with WaterfallPool(loanpool, structuredsecurity, num_processes) as pool:
+        return pool.simulate(structuredsecurity.get_rates(), num_sim, seed)
@@ -0,0 +1,44 @@
+"""
+This script tests the array-backed Ledger used by the tranches
+"""
+
+from Tranche.ledger import Ledger
+
+
+def main():
+    ledger = Ledger(capacity=4)
+    for period, amount in enumerate([0, 10, 20, 30]):
+        ledger[period] = amount
+    assert len(ledger) == 4 and ledger.total() == 60
+    assert [ledger.total_before(n) for n in range(6)] == [0, 0, 10, 30, 60, 60]
+
+    # recording past the capacity grows the arrays and keeps the recorded amounts
+    ledger[9] = 5
+    assert 9 in ledger and 5 not in ledger
+    assert list(ledger.keys()) == [0, 1, 2, 3, 9] and list(ledger.values()) == [0, 10, 20, 30, 5]
+    assert list(ledger.array()) == [0, 10, 20, 30, 0, 0, 0, 0, 0, 5]
+    assert ledger.total() == 65 and ledger.total_before(9) == 60
+    try:
+        ledger[5]
+    except KeyError:
+        pass
+    else:
+        raise AssertionError('unrecorded periods must raise KeyError')
+    print('ledger grows and keeps running totals:', dict(ledger.items()))
+
+    # overwriting a past period updates the running totals after it
+    ledger[2] = 25
+    assert ledger[2] == 25 and ledger.total() == 70 and ledger.total_before(3) == 35
+    ledger[12] = 1
+    assert ledger.total() == 71 and ledger.total_before(12) == 70
+
+    # reset keeps the capacity but clears the amounts
+    ledger.reset()
+    assert len(ledger) == 0 and ledger.total() == 0 and 0 not in ledger
+    ledger[0] = 7
+    assert ledger.total() == 7 and list(ledger.array()) == [7]
+    print('ledger overwrites and resets correctly')
+
+
+if __name__ == '__main__':
+    main()
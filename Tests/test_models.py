@@ -0,0 +1,70 @@
+"""
+This script tests the default and recovery model objects used by the loan pools
+"""
+
+import numpy as np
+from Loan.default_models import PiecewiseHazard, ConstantCDR, LoanLevelHazard
+from Loan.recovery_models import ConstantRecovery, RecoveryCurve
+from Loan.loan_pool import LoanPool
+from Loan.columnar_pool import ColumnarLoanPool
+from Loan.auto_loan import AutoLoan
+from Asset.cars import Car
+
+
+def create_loans(num_loans, seed):
+    """Creates random auto loans"""
+    rng = np.random.default_rng(seed)
+    return [AutoLoan(float(rng.uniform(5000, 30000)), float(rng.uniform(0.02, 0.12)), int(rng.integers(36, 73)),
+                     Car(float(rng.uniform(10000, 40000)))) for _ in range(num_loans)]
+
+
+def main():
+    # piecewise hazard: probabilities[i] for periods up to time_periods[i], the last one after that
+    model = PiecewiseHazard()
+    periods = np.array([0, 1, 10, 11, 60, 61, 120, 121, 180, 181, 210, 211, 360, 361, 500])
+    expected = [0.0005, 0.0005, 0.0005, 0.001, 0.001, 0.002, 0.002, 0.004, 0.004, 0.002, 0.002, 0.001, 0.001,
+                0.001, 0.001]
+    assert np.array_equal(model.hazard(periods), expected), model.hazard(periods)
+    assert model.default_probabilities(periods).shape == (len(periods), 1)
+    print('PiecewiseHazard table matches the hazard table')
+
+    # constant CDR: 1 - (1 - cdr) ** (1 / 12) every month, so a year of survival is 1 - cdr
+    model = ConstantCDR(0.06)
+    hazard = model.hazard(np.arange(1, 13))
+    assert np.allclose(hazard, 1 - 0.94 ** (1 / 12)) and np.isclose(np.prod(1 - hazard), 0.94)
+    print('ConstantCDR compounds to the annual default rate')
+
+    # constant recovery: rate times the depreciated asset value
+    loans = create_loans(20, seed=0)
+    pool = ColumnarLoanPool(loans, recovery_model=ConstantRecovery(0.2))
+    recovery = pool.recovery_model.recovery(np.array([0, 5, 30]), pool)
+    expected = np.array([[0.2 * loan.asset.value(n) for loan in loans] for n in (0, 5, 30)])
+    assert np.allclose(recovery, expected)
+    assert np.isclose(loans[3].recovery_value(5, ConstantRecovery(0.2)), expected[1, 3])
+    assert np.allclose(pool.recovery_model.recovery(np.array([5]), pool, [1, 3])[0], expected[1, [1, 3]])
+    print('ConstantRecovery values the assets at the recovery rate')
+
+    curve = RecoveryCurve([0.7, 0.6, 0.5])
+    assert np.array_equal(curve.recovery_rates(np.array([0, 1, 2, 9]))[:, 0], [0.7, 0.6, 0.5, 0.5])
+    assert curve.recovery_rate(9) == 0.5
+
+    # both loan pools recover the same amounts with the pool's recovery model
+    for recovery_model in (ConstantRecovery(0.2), curve):
+        recoveries = []
+        for pool_class in (LoanPool, ColumnarLoanPool):
+            pool = pool_class(loans, default_model=ConstantCDR(0.5), recovery_model=recovery_model)
+            rng = np.random.default_rng(1)
+            recoveries.append([pool.check_defaults(n, rng) for n in range(1, 37)])
+            pool.reset()
+        assert np.allclose(recoveries[0], recoveries[1]) and sum(recoveries[0]) > 0
+    print('LoanPool and ColumnarLoanPool recover the same amounts')
+
+    # loan level hazards average to the base hazard for the notional weighted average loan
+    pool = ColumnarLoanPool(loans, default_model=LoanLevelHazard(rate_sensitivity=0, ltv_sensitivity=0))
+    assert np.allclose(pool.hazard(np.arange(1, 61)), PiecewiseHazard().hazard(np.arange(1, 61))[:, None])
+    assert pool.hazard(np.arange(1, 61)).shape == (60, 20)
+    print('LoanLevelHazard scales the base hazard per loan')
+
+
+if __name__ == '__main__':
+    main()
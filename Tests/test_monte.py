@@ -38,8 +38,8 @@ def main():
             loan_pool.loans.append(loan)  # add loan to loan pool
 
     security = StructuredSecurity(loan_pool.total_principal(), 'Sequential')
-    security.add_tranche(0.8, 0.05, 'A')
-    security.add_tranche(0.2, 0.08, 'B')
+    security.add_tranche(0.8, 0.05, 'A', 1.2)
+    security.add_tranche(0.2, 0.08, 'B', 0.8)
 
     with Timer('Timer monte 1') as t:
         dirrs, als, tranche_ratings, irr = run_monte(loan_pool, security, 0.005, 10, 2)
@@ -0,0 +1,50 @@
+"""
+This script tests the batched Newton IRR solver against numpy_financial
+"""
+
+import numpy as np
+import numpy_financial as npf
+from Tranche.yield_solver import irr
+
+
+def random_cashflows(rng, num_rows, periods):
+    """Returns rows of an investment of 100 followed by random non-negative amounts received"""
+    received = rng.uniform(0, 4, (num_rows, periods)) * (rng.random((num_rows, periods)) > 0.1)
+    return np.concatenate((np.full((num_rows, 1), -100.0), received), axis=1)
+
+
+def main():
+    rng = np.random.default_rng(0)
+    values = random_cashflows(rng, 200, 60)
+    values[:5, 1:] *= 0.2  # deep losses
+    values[5:10, 1:] *= 3  # high yields
+    rates = irr(values, guess=0.05 / 12)
+    expected = np.array([npf.irr(row) for row in values])
+    assert np.allclose(rates, expected, rtol=0, atol=1e-10), np.abs(rates - expected).max()
+    print(f'irr matches npf.irr on {len(values)} rows, max difference {np.abs(rates - expected).max():.2e}')
+
+    # the solver works on any leading shape, e.g. (tranche x path x period)
+    cube = values.reshape(4, 50, 61)
+    assert np.array_equal(irr(cube, guess=0.05 / 12), irr(values, guess=0.05 / 12).reshape(4, 50))
+
+    # no sign change: nothing received or nothing invested gives NaN like npf.irr
+    no_sign_change = np.array([[-100.0] + [0.0] * 12, [0.0] + [5.0] * 12, [0.0] * 13])
+    rates = irr(no_sign_change)
+    assert np.isnan(rates).all(), rates
+    assert all(np.isnan(npf.irr(row)) for row in no_sign_change[:2])
+    print('rows without a sign change give NaN')
+
+    # a single row and a single amount received
+    assert np.isclose(irr([-100.0, 110.0]), 0.1)
+    assert np.isclose(irr([-100.0, 1.0, 1.0, 101.0], guess=0.01), npf.irr([-100.0, 1.0, 1.0, 101.0]))
+    print('single rows match')
+
+    # a 360 period deep loss: the bracket grows until v ** 359 overflows on the periods that receive nothing
+    deep_loss = np.array([-100.0, 0.01] + [0.0] * 359)
+    assert np.isclose(irr(deep_loss), -0.9999, rtol=0, atol=1e-12), irr(deep_loss)
+    assert np.isclose(irr(deep_loss, guess=0.05 / 12), npf.irr(deep_loss), rtol=0, atol=1e-10)
+    print('360 period deep loss matches')
+
+
+if __name__ == '__main__':
+    main()
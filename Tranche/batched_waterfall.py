@@ -0,0 +1,166 @@
+"""
+This module contains the batched waterfall which pays the tranches for many simulated paths at once
+"""
+import numpy as np
+from Tranche import ratings
+from Tranche.yield_solver import irr
+
+
+class TranchePaths(object):
+    """
+    Tranche payments for every simulated path. Each cube is (tranche x path x period) with period 0 being
+    the start of the deal; tranches are in subordination order.
+    """
+
+    def __init__(self, notionals, rates, interest_due, interest_paid, interest_shortfall, principal_paid,
+                 balance, reserve_account, total_principal):
+        self._notionals = np.asarray(notionals, dtype=float)
+        self._rates = np.asarray(rates, dtype=float)
+        self._interest_due = interest_due
+        self._interest_paid = interest_paid
+        self._interest_shortfall = interest_shortfall
+        self._principal_paid = principal_paid
+        self._balance = balance
+        self._reserve_account = reserve_account
+        self._total_principal = total_principal  # summed period by period, like the tranche ledgers
+
+    @property
+    def interest_due(self):
+        return self._interest_due
+
+    @property
+    def interest_paid(self):
+        return self._interest_paid
+
+    @property
+    def interest_shortfall(self):
+        return self._interest_shortfall
+
+    @property
+    def principal_paid(self):
+        return self._principal_paid
+
+    @property
+    def balance(self):
+        return self._balance
+
+    @property
+    def reserve_account(self):
+        return self._reserve_account
+
+    def save(self, filename):
+        """Saves the payment cubes to a NumPy .npz file"""
+        np.savez(filename, notionals=self._notionals, rates=self._rates, interest_due=self._interest_due,
+                 interest_paid=self._interest_paid, interest_shortfall=self._interest_shortfall,
+                 principal_paid=self._principal_paid, balance=self._balance,
+                 reserve_account=self._reserve_account, total_principal=self._total_principal)
+
+    @classmethod
+    def load(cls, filename):
+        """Loads payment cubes saved with save"""
+        with np.load(filename) as data:
+            return cls(data['notionals'], data['rates'], data['interest_due'], data['interest_paid'],
+                       data['interest_shortfall'], data['principal_paid'], data['balance'],
+                       data['reserve_account'], data['total_principal'])
+
+    def cashflows(self):
+        """Returns the (tranche x path x period) principal plus interest paid in periods 1 onwards"""
+        return self._principal_paid[:, :, 1:] + self._interest_paid[:, :, 1:]
+
+    def IRR(self):
+        """Returns the (tranche x path) annual internal rate of return, solved for every path at once"""
+        cashflows = self.cashflows()
+        invested = np.broadcast_to(-self._notionals[:, None, None], cashflows.shape[:2] + (1,))
+        return irr(np.concatenate((invested, cashflows), axis=2), self._rates[:, None] / 12) * 12
+
+    def DIRR(self, irr=None):
+        """Returns the (tranche x path) reduction in yield"""
+        if irr is None:
+            irr = self.IRR()
+        return np.round(self._rates[:, None] - irr, 2)
+
+    def AL(self):
+        """Returns the (tranche x path) average life, NaN where the principal is not paid down"""
+        periods = np.arange(self._principal_paid.shape[2])
+        al = np.round(self._principal_paid @ periods / self._notionals[:, None], 2)
+        return np.where(np.abs(self._total_principal - self._notionals[:, None]) > 0, np.nan, al)
+
+    def metrics(self):
+        """Returns the (tranche x path) IRR, DIRR, AL and ABS rating of every path"""
+        irrs = self.IRR()
+        dirrs = self.DIRR(irrs)
+        return irrs, dirrs, self.AL(), ratings.ratings(dirrs)
+
+    def rating_distribution(self, weights=None, dirr=None):
+        """Returns the (tranche x rating) share of paths per ABS rating, paths weighted by weights if given"""
+        return ratings.rating_distribution(self.DIRR() if dirr is None else dirr, weights)
+
+
+def batched_waterfall(notionals, rates, mode, collections, principal_received, total_notional=None):
+    """
+    Pays the tranches (in subordination order) for every path at once. collections and principal_received
+    are (path x period) matrices of cash collected and principal received by the loan pool. Interest is
+    paid first, then principal, either 'Sequential' or 'Pro Rata'; cash left over is carried in the reserve
+    account to the next period. Pro Rata shares are taken of total_notional, which defaults to the sum
+    of the tranche notionals.
+    """
+    notionals = np.asarray(notionals, dtype=float)
+    monthly_rates = np.asarray(rates, dtype=float) / 12
+    if total_notional is None:
+        total_notional = notionals.sum()
+    num_tranches = len(notionals)
+    num_paths, num_columns = collections.shape
+
+    cubes = {name: np.zeros((num_tranches, num_paths, num_columns)) for name in
+             ('interest_due', 'interest_paid', 'interest_shortfall', 'principal_paid', 'balance')}
+    cubes['balance'][:, :, 0] = notionals[:, None]
+    reserve_account = np.zeros((num_paths, num_columns))
+
+    # running totals of the tranche ledgers: principal paid and interest shortfall before the current period
+    principal_total = np.zeros((num_tranches, num_paths))
+    shortfall_before = np.zeros((num_tranches, num_paths))
+    principal_shortfall = np.zeros((num_tranches, num_paths))
+
+    for period in range(1, num_columns):
+        cash_available = collections[:, period] + reserve_account[:, period - 1]
+        if period > 1:
+            shortfall_before += cubes['interest_shortfall'][:, :, period - 1]
+
+        # interest payments
+        for t in range(num_tranches):
+            balance = np.maximum(0, notionals[t] - principal_total[t] + shortfall_before[t])
+            interest_due = balance * monthly_rates[t] + cubes['interest_shortfall'][t, :, period - 1]
+            interest_paid = np.minimum(cash_available, interest_due)
+            cubes['interest_due'][t, :, period] = interest_due
+            cubes['interest_paid'][t, :, period] = interest_paid
+            cubes['interest_shortfall'][t, :, period] = np.maximum(0, interest_due - interest_paid)
+            cash_available = cash_available - interest_paid
+
+        # principal payments
+        prin_received = principal_received[:, period].copy()
+        total_prin_paid = np.zeros(num_paths)
+        for t in range(num_tranches):
+            prin_received += principal_shortfall[t]
+            balance = np.maximum(0, notionals[t] - principal_total[t] + shortfall_before[t])
+            if mode == 'Sequential':
+                prin_due = np.minimum(balance, prin_received)
+            elif mode == 'Pro Rata':
+                prin_due = np.minimum(balance, prin_received * (notionals[t] / total_notional))
+            else:
+                raise ValueError(f'Unknown waterfall mode {mode}')
+            prin_paid = np.minimum(cash_available, prin_due)
+            principal_shortfall[t] = np.maximum(0, prin_due - prin_paid)
+            payment = np.where(balance == 0, 0, prin_paid)  # nothing is recorded once the tranche is paid down
+            cubes['principal_paid'][t, :, period] = payment
+            principal_total[t] += payment
+            cubes['balance'][t, :, period] = np.maximum(0, notionals[t] - principal_total[t] + shortfall_before[t])
+            if mode == 'Sequential':
+                prin_received -= prin_paid
+                cash_available = cash_available - prin_paid
+            else:
+                total_prin_paid += prin_paid
+        reserve_account[:, period] = cash_available - total_prin_paid
+
+    return TranchePaths(notionals, rates, cubes['interest_due'], cubes['interest_paid'],
+                        cubes['interest_shortfall'], cubes['principal_paid'], cubes['balance'], reserve_account,
+                        principal_total)
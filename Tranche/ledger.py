@@ -0,0 +1,90 @@
+"""
+This module contains the Ledger class used by the tranches to record amounts per period
+"""
+import numpy as np
+
+
+class Ledger(object):
+    """
+    Records one amount per period in a preallocated NumPy array and keeps a running cumulative total,
+    so totals up to any period are O(1) reads. Supports the dict operations the tranches used before
+    (ledger[period], ledger[period] = amount, period in ledger).
+    """
+
+    def __init__(self, capacity=361):
+        self._values = np.zeros(capacity)
+        self._cumulative = np.zeros(capacity)
+        self._recorded = np.zeros(capacity, dtype=bool)
+        self._end = 0  # one past the last recorded period
+
+    def __contains__(self, period):
+        return period < self._end and self._recorded[period]
+
+    def __getitem__(self, period):
+        if period not in self:
+            raise KeyError(period)
+        return self._values[period]
+
+    def __setitem__(self, period, amount):
+        if period >= len(self._values):
+            self._grow(period + 1)
+        self._values[period] = amount
+        self._recorded[period] = True
+        if period >= self._end:
+            # periods are normally recorded in order, so the running total is extended by one step
+            total = self._cumulative[self._end - 1] if self._end else 0
+            for n in range(self._end, period + 1):
+                total += self._values[n]
+                self._cumulative[n] = total
+            self._end = period + 1
+        else:
+            total = self._cumulative[period - 1] if period else 0
+            for n in range(period, self._end):
+                total += self._values[n]
+                self._cumulative[n] = total
+
+    def __len__(self):
+        return int(np.count_nonzero(self._recorded[:self._end]))
+
+    def _grow(self, size):
+        """Doubles the capacity until the given number of periods fits"""
+        capacity = len(self._values)
+        while capacity < size:
+            capacity *= 2
+        for name in ('_values', '_cumulative', '_recorded'):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def keys(self):
+        """Returns the recorded periods in order"""
+        return np.flatnonzero(self._recorded[:self._end])
+
+    def values(self):
+        """Returns the recorded amounts in period order"""
+        return self._values[:self._end][self._recorded[:self._end]]
+
+    def items(self):
+        return zip(self.keys(), self.values())
+
+    def array(self):
+        """Returns the amounts for periods 0 to the last recorded period, with 0 for unrecorded periods"""
+        return self._values[:self._end]
+
+    def total(self):
+        """Returns the sum of all recorded amounts"""
+        return self._cumulative[self._end - 1] if self._end else 0
+
+    def total_before(self, period):
+        """Returns the sum of the amounts recorded before the given period"""
+        if period <= 0:
+            return 0
+        return self._cumulative[min(period, self._end) - 1] if self._end else 0
+
+    def reset(self):
+        """Clears the recorded amounts, keeping the allocated arrays"""
+        self._values[:self._end] = 0
+        self._cumulative[:self._end] = 0
+        self._recorded[:self._end] = False
+        self._end = 0
@@ -0,0 +1,49 @@
+"""
+This module contains the ABS rating table and the rating lookups shared by the tranches and the Monte Carlo
+"""
+import numpy as np
+
+# a DIRR (in basis points) up to DIRR_bps[i + 1] is rated letter_ratings[i]
+DIRR_bps = np.array([-np.inf, 0.06, 0.67, 1.3, 2.7, 5.2, 8.9, 13, 19,
+                     27, 46, 72, 106, 143, 183, 231, 311, 2500, 10000])
+letter_ratings = ["Aaa", "Aa1", "Aa2", "Aa3", "A1", "A2", "A3", "Baa1", "Baa2",
+                  "Baa3", "Ba1", "Ba2", "Ba3", "B1", "B2", "B3", "Caa", "Ca"]
+_letters = np.array(letter_ratings)
+
+
+def rating_codes(dirr):
+    """
+    Returns the rating codes (indexes into letter_ratings, 0 = Aaa) for a DIRR or an array of DIRRs. DIRRs
+    beyond the table and NaN DIRRs (tranches that receive nothing) get the lowest rating.
+    """
+    index = np.searchsorted(DIRR_bps, np.asarray(dirr) * 10000.0) - 1
+    return np.clip(index, 0, len(letter_ratings) - 1)
+
+
+def ratings(dirr):
+    """Returns the letter ratings for an array of DIRRs"""
+    return _letters[rating_codes(dirr)]
+
+
+def rating(dirr):
+    """Returns the letter rating for a single DIRR"""
+    return letter_ratings[int(rating_codes(dirr))]
+
+
+def rating_histogram(dirr, weights=None):
+    """
+    Returns the (tranche x rating) count of paths per rating for a (tranche x path) array of DIRRs,
+    weighting each path by weights (e.g. importance sampling path weights) if given
+    """
+    codes = np.atleast_2d(rating_codes(dirr))
+    num_ratings = len(letter_ratings)
+    offsets = codes + num_ratings * np.arange(len(codes))[:, None]
+    path_weights = None if weights is None else np.broadcast_to(weights, codes.shape).ravel()
+    counts = np.bincount(offsets.ravel(), path_weights, minlength=num_ratings * len(codes))
+    return counts.reshape(len(codes), num_ratings)
+
+
+def rating_distribution(dirr, weights=None):
+    """Returns the (tranche x rating) share of paths per rating for a (tranche x path) array of DIRRs"""
+    counts = rating_histogram(dirr, weights)
+    return counts / counts.sum(axis=1, keepdims=True)
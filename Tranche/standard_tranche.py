@@ -1,15 +1,21 @@
-import logging
 from Tranche.tranche_base import Tranche
-from collections import Counter
+from Tranche.ledger import Ledger
+from Diagnostics.diagnostics import get_diagnostics
+
+diagnostics = get_diagnostics(__name__)
 
 
 class StandardTranche(Tranche):
-    def __init__(self, notional, rate, subordination):
-        super(StandardTranche, self).__init__(notional, rate, subordination)
+    __slots__ = ('_period', '_interest_shortfall', '_interestdue', '_principal_shortfall')
+
+    def __init__(self, notional, rate, subordination, coefficient=None):
+        super(StandardTranche, self).__init__(notional, rate, subordination, coefficient)
         self._period = 0
-        self._interest_shortfall = {0: 0}
-        self._interestdue = {}
-        self._principal_shortfall = {0: 0}
+        self._interest_shortfall = Ledger()
+        self._interest_shortfall[0] = 0
+        self._interestdue = Ledger()
+        self._principal_shortfall = Ledger()
+        self._principal_shortfall[0] = 0
 
     @property
     def interest_shortfall(self):
@@ -33,31 +39,33 @@ class StandardTranche(Tranche):
 
     def make_principal_payment(self, amount):
         """Records the principal payment made for current period"""
-        if self._period in self._principal_payments.keys():
+        if self._period in self._principal_payments:
             raise Exception(f'Principal payment for {self._period} has already been paid')
         elif self.notional_balance() == 0:
             self._principal_payments[self._period] = 0
-            logging.debug('Balance is 0')
+            if diagnostics.enabled:
+                diagnostics.log('Balance is 0 at period %s', self._period)
             return 0
         else:
             self._principal_payments[self._period] = amount
 
     def make_interest_payment(self, amount):
         """Records the interest payment for current period"""
-        if self._period in self._interest_payments.keys():
+        if self._period in self._interest_payments:
             raise Exception(f'Interest payment for {self._period} has already been paid')
         elif self.interest_due() == 0:
             self._interest_payments[self._period] = 0
             self._interest_shortfall[self._period] = 0
-            logging.debug('Interest due is 0')
+            if diagnostics.enabled:
+                diagnostics.log('Interest due is 0 at period %s', self._period)
         else:
             self._interest_payments[self._period] = amount
             self._interest_shortfall[self._period] = max(0, self.interest_due() - amount)
 
     def notional_balance(self):
         """Returns the notional balance still due for current time period"""
-        total_prin_paid = sum(list(self._principal_payments.values()))
-        int_shortfall = sum(list(self._interest_shortfall.values())[:self._period])
+        total_prin_paid = self._principal_payments.total()
+        int_shortfall = self._interest_shortfall.total_before(self._period)
         return max(0, self.notional - total_prin_paid + int_shortfall)
 
     def interest_due(self):
@@ -71,8 +79,9 @@ class StandardTranche(Tranche):
     def reset(self):
         """Resets the tranche to its original state (time 0)"""
         self._period = 0
-        self._interest_shortfall = {0: 0}
-        self._interestdue = {}
-        self._principal_shortfall = {0: 0}
-        self._principal_payments = {0: 0}
-        self._interest_payments = {}
+        for ledger in (self._interest_shortfall, self._interestdue, self._principal_shortfall,
+                       self._principal_payments, self._interest_payments):
+            ledger.reset()
+        self._interest_shortfall[0] = 0
+        self._principal_shortfall[0] = 0
+        self._principal_payments[0] = 0
@@ -3,6 +3,7 @@ This module contains the Structured Security class
 """
 
 from Tranche.standard_tranche import StandardTranche
+from Tranche.batched_waterfall import batched_waterfall
 
 
 class StructuredSecurity(object):
@@ -49,10 +50,14 @@ class StructuredSecurity(object):
         """Returns list of tranche notionals"""
         return [tranche.notional for tranche in self._tranches]
 
-    def add_tranche(self, percent_notional, rate, subordination):
+    def get_coefficients(self):
+        """Returns list of tranche rate relaxation coefficients"""
+        return [tranche.coefficient for tranche in self._tranches]
+
+    def add_tranche(self, percent_notional, rate, subordination, coefficient=None):
         """Adds tranches to the object"""
         # instantiate tranche with percent of total notional
-        tranche = StandardTranche(percent_notional * self._total_notional, rate, subordination)
+        tranche = StandardTranche(percent_notional * self._total_notional, rate, subordination, coefficient)
         self._tranches.append(tranche)  # add tranche to internal list of tranches
         self._tranches.sort(key=lambda x: x.subordination)  # sort tranche list based on subordination
 
@@ -61,8 +66,11 @@ class StructuredSecurity(object):
         for tranche in self._tranches:
             tranche.increase_periods()
 
-    def make_payments(self, amount):
-        """Cycles through and pays the tranches"""
+    def make_payments(self, amount, principal_received=None):
+        """
+        Cycles through and pays the tranches. The principal received is asked from the loan pool unless it is
+        given, e.g. from a simulated path.
+        """
         cash_available = amount + self._reserve_account
 
         # Interest payment calculations
@@ -73,7 +81,10 @@ class StructuredSecurity(object):
             tranche.make_interest_payment(interest_paid)
             cash_available -= interest_paid  # calculate remaining cash available
 
-        prin_recieved = self._loanpool.principal_due(self._period)  # get total principal received from loan pool
+        if principal_received is None:
+            prin_recieved = self._loanpool.principal_due(self._period)  # get total principal received from loan pool
+        else:
+            prin_recieved = principal_received
         # Principal payment calculations
         if self._mode == 'Sequential':
             for tranche in self._tranches:
@@ -101,6 +112,17 @@ class StructuredSecurity(object):
             cash_available -= total_prin_paid
         self._reserve_account = cash_available
 
+    def make_payments_batched(self, collections, principal_received, rates=None):
+        """
+        Pays the tranches for many paths at once from (path x period) matrices of collections and principal
+        received, and returns the TranchePaths payment cubes. Uses the tranche rates unless rates are given;
+        the tranches themselves are not changed.
+        """
+        if rates is None:
+            rates = self.get_rates()
+        return batched_waterfall(self.get_notionals(), rates, self._mode, collections, principal_received,
+                                 self._total_notional)
+
     # def add_cashflows(self):
     #     for tranche in self._tranches:
     #         cdict = Counter(tranche.principal_payments) + Counter(tranche.interest_payments)
@@ -1,17 +1,17 @@
 """This module contains the abstract Tranche base class"""
 import logging
-import numpy_financial as npf
 import numpy as np
-from collections import Counter
+from Tranche.ledger import Ledger
+from Tranche.yield_solver import irr
+from Tranche import ratings
 
 
 class Tranche(object):
-    DIRR_bps = np.array([-np.inf, 0.06, 0.67, 1.3, 2.7, 5.2, 8.9, 13, 19,
-                         27, 46, 72, 106, 143, 183, 231, 311, 2500, 10000])
-    letter_ratings = ["Aaa", "Aa1", "Aa2", "Aa3", "A1", "A2", "A3", "Baa1", "Baa2",
-                      "Baa3", "Ba1", "Ba2", "Ba3", "B1", "B2", "B3", "Caa", "Ca"]
+    __slots__ = ('_notional', '_rate', '_subordination', '_coefficient', '_principal_payments', '_interest_payments')
+    DIRR_bps = ratings.DIRR_bps
+    letter_ratings = ratings.letter_ratings
 
-    def __init__(self, notional, rate, subordination):
+    def __init__(self, notional, rate, subordination, coefficient=None):
         if isinstance(notional, (float, int)):
             self._notional = notional
         else:
@@ -21,8 +21,10 @@ class Tranche(object):
         else:
             logging.error('Rate must be a Float and less than 1')
         self._subordination = subordination
-        self._principal_payments = {0: 0}
-        self._interest_payments = {}
+        self._coefficient = coefficient  # Monte Carlo rate relaxation coefficient; None for the default
+        self._principal_payments = Ledger()
+        self._principal_payments[0] = 0
+        self._interest_payments = Ledger()
 
     @property
     def notional(self):
@@ -48,6 +50,14 @@ class Tranche(object):
     def subordination(self, isub):
         self._subordination = isub
 
+    @property
+    def coefficient(self):
+        return self._coefficient
+
+    @coefficient.setter
+    def coefficient(self, icoefficient):
+        self._coefficient = icoefficient
+
     @property
     def principal_payments(self):
         return self._principal_payments
@@ -64,12 +74,19 @@ class Tranche(object):
     def toString(self):
         raise NotImplementedError()
 
+    def cashflows(self):
+        """Returns the principal plus interest paid in periods 1 onwards, without trailing zero periods"""
+        principal = self._principal_payments.array()
+        interest = self._interest_payments.array()
+        cashflows = np.zeros(max(len(principal), len(interest)))
+        cashflows[:len(principal)] += principal
+        cashflows[:len(interest)] += interest
+        return np.trim_zeros(cashflows[1:], 'b')
+
     def IRR(self):
         """Returns in internal rate of return for the tranche"""
-        cdict = Counter(self._principal_payments) + Counter(self._interest_payments)
-        clist = list(dict(cdict).values())
-        clist.insert(0, -self._notional)
-        return npf.irr(clist) * 12
+        clist = np.concatenate(([-self._notional], self.cashflows()))
+        return float(irr(clist, self.monthly_rate(self._rate))) * 12
 
     def DIRR(self):
         """Returns the reduction in yield"""
@@ -78,16 +95,20 @@ class Tranche(object):
 
     def AL(self):
         """Returns the average life of the tranche"""
-        sum_product = [x * y for x, y in enumerate(self._principal_payments.values())]
-        total_prin_payments = sum(self._principal_payments.values())
+        principal = self._principal_payments.array()
+        total_prin_payments = self._principal_payments.total()
         if abs(total_prin_payments - self._notional) > 0:  # if principal is not paid down
-            return np.NaN
+            return np.nan
         else:
-            return round(sum(sum_product) / self._notional, 2)
+            return round(np.dot(np.arange(len(principal)), principal) / self._notional, 2)
 
     @classmethod
     def abs_rating(cls, dirr):
         """Returns the ABS rating for a given DIRR"""
-        index = np.where(cls.DIRR_bps >= dirr * 10000.0)[0][0] - 1
-        return cls.letter_ratings[index]
+        return ratings.rating(dirr)
+
+    @classmethod
+    def abs_ratings(cls, dirr):
+        """Returns an array of ABS ratings for an array of DIRRs"""
+        return ratings.ratings(dirr)
 
@@ -0,0 +1,58 @@
+"""
+This module contains the batched yield solver used for the tranche internal rates of return
+"""
+import numpy as np
+
+
+def irr(values, guess=None, tol=1e-12, max_iter=100):
+    """
+    Returns the per-period internal rate of return of each row of values (..., periods), where column 0 is
+    the amount invested (negative) and the other columns are the non-negative amounts received, like
+    npf.irr for each row. Rows that receive nothing are NaN.
+
+    The discount factor v = 1 / (1 + rate) of each row is solved with Newton steps started from guess
+    (e.g. the coupon rate per period), falling back to bisection whenever a step leaves the bracket
+    around the root, so every row converges.
+    """
+    values = np.asarray(values, dtype=float)
+    invested = -values[..., 0]
+    received = values[..., 1:]
+    times = np.arange(1, values.shape[-1])
+    total = received.sum(axis=-1)
+    valid = (total > 0) & (invested > 0)
+
+    def npv(v):
+        """
+        Returns the net present value of each row at discount factors v and its derivative. v ** times can
+        overflow for large v on long rows; periods that receive nothing are masked so they add 0, not 0 * inf.
+        """
+        with np.errstate(over='ignore', invalid='ignore'):
+            discount = v[..., None] ** times
+            present = np.where(received > 0, received * discount, 0)
+            slope = np.where(received > 0, present * times, 0).sum(axis=-1) / v
+        return present.sum(axis=-1) - invested, slope
+
+    # npv is increasing in v, negative at v = 0; the bracket is widened until npv(hi) >= 0
+    lo = np.zeros(invested.shape)
+    hi = np.ones(invested.shape)
+    value, _ = npv(hi)
+    while np.any(valid & (value < 0)):
+        hi = np.where(value < 0, 2 * hi, hi)
+        value, _ = npv(hi)
+
+    v = np.full(invested.shape, 1.0) if guess is None else np.broadcast_to(1 / (1 + np.asarray(guess, float)),
+                                                                           invested.shape).copy()
+    v = np.where((v > lo) & (v < hi), v, hi)
+    v[~valid] = 1.0
+    for _ in range(max_iter):
+        value, slope = npv(v)
+        lo = np.where(value < 0, v, lo)
+        hi = np.where(value > 0, v, hi)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = v - value / slope
+        step = np.where((step > lo) & (step < hi), step, (lo + hi) / 2)  # bisect if Newton leaves the bracket
+        done = ~valid | (np.abs(step - v) <= tol * v)
+        v = np.where(valid, step, v)
+        if done.all():
+            break
+    return np.where(valid, 1 / v - 1, np.nan)
@@ -1,17 +1,14 @@
 """This script demonstrates the simulation functions with parallelization"""
 
 import csv
+import numpy as np
 from Simulations.run_monte import run_monte
-from Loan.loan_pool import LoanPool
-from Loan.auto_loan import AutoLoan
-from Asset.cars import Car
+from Simulations.scenario_grid import run_scenario_grid, write_results
+from Loan.loan_tape import loan_dict, LoanTapeLoader
 from Tranche.structured_security import StructuredSecurity
 from Timer.timer import Timer
 from waterfall import do_waterfall
 
-loan_dict = {'Auto Loan': AutoLoan,
-             'Car': Car}
-
 
 def create_loan(loan_type, asset_name, asset_value, principal, rate, term):
     """Creates Loan objects from csv input"""
@@ -29,19 +26,15 @@ def write_to_csv(filename, input):
 
 
 def main():
-    loan_pool = LoanPool([])
-    # initialize loan pool
-    with open('Loans_csv.csv') as file:
-        reader = csv.DictReader(file)
-        for row in reader:  # create loan objects
-            loan = create_loan(row.get('Loan Type'), row.get('Asset'), row.get('Asset Value'), row.get('Balance'),
-                               row.get('Rate'), row.get('Term'))
-            loan_pool.loans.append(loan)  # add loan to loan pool
+    # initialize loan pool straight from the loan tape columns
+    loader = LoanTapeLoader('Loans_csv.csv')
+    loan_pool = loader.load()
+    print(f'Loaded {loader.rows} loans at {loader.rows_per_second:.0f} rows/sec')
 
     # initialize structured security with tranches
     security = StructuredSecurity(loan_pool.total_principal(), 'Sequential')
-    security.add_tranche(0.8, 0.05, 'A')
-    security.add_tranche(0.2, 0.08, 'B')
+    security.add_tranche(0.8, 0.05, 'A', 1.2)
+    security.add_tranche(0.2, 0.08, 'B', 0.8)
 
     # waterfall function to get waterfall
     assets, liabilities, metrics = do_waterfall(loan_pool, security)
@@ -66,6 +59,9 @@ def main():
         writer.writerow(header)
         writer.writerows(assets)
 
+    # binary copy of the waterfall which can be reread without text conversion
+    np.savez('wf_LOANS_SEQ_recoveries.npz', assets=np.array(assets), liabilities=np.array(newlist))
+
     # run monte function with parallel simulations
     with Timer('Timer final') as t:
         dirrs, als, tranche_ratings, irrs = run_monte(loan_pool, security, 0.005, 2000, 40)
@@ -74,6 +70,13 @@ def main():
         print(tranche_ratings)
         print(irrs)
 
+    # value alternative structures under base and stressed defaults on shared simulated paths
+    with Timer('Timer scenario grid') as t:
+        results = run_scenario_grid(loan_pool, splits=[(0.8, 0.2), (0.9, 0.1)], coupons=[(0.05, 0.08)],
+                                    modes=['Sequential', 'Pro Rata'], default_curves={'base': None, 'stress': 2.0},
+                                    recovery_rates=[0.6, 0.4], num_sim=1000, num_processes=4, seed=0)
+        write_results('scenario_grid_results.csv', results)
+
 
 if __name__ == '__main__':
     main()
@@ -4,9 +4,16 @@ This script contains the stand alone Waterfall function
 
 from Loan.loan_pool import LoanPool
 from Tranche.structured_security import StructuredSecurity
+import numpy as np
 
 
-def do_waterfall(loanpool, structuredsecurity):
+def do_waterfall(loanpool, structuredsecurity, rng=None):
+    """
+    Runs one waterfall path, drawing the defaults of every period from the random Generator rng (a fresh
+    unseeded one if not given)
+    """
+    if rng is None:
+        rng = np.random.default_rng()  # one generator for the whole path, not one per period
     period = 0
     lp_waterfalls = []
     ss_waterfalls = []
@@ -15,7 +22,7 @@ def do_waterfall(loanpool, structuredsecurity):
         structuredsecurity.increase_period()
         period += 1
         structuredsecurity.loanpool = loanpool
-        recovery_amount = loanpool.check_defaults(period)
+        recovery_amount = loanpool.check_defaults(period, rng)
         total_payment = loanpool.payment_due(period) + recovery_amount  # ask the loanpool for its total payment for
         # current period
         structuredsecurity.make_payments(total_payment)  # pay structured securities
@@ -32,3 +39,18 @@ def do_waterfall(loanpool, structuredsecurity):
     # print(f'Tranche {tranche.subordination} AL: {tranche.AL()}')
 
     return [lp_waterfalls, ss_waterfalls, metrics]
+
+
+def do_path_waterfall(structuredsecurity, collections, principal):
+    """
+    Runs the tranche waterfall for one simulated path, given the cash collected and the principal received
+    for each period (index 0 is the start of the deal)
+    """
+    ss_waterfalls = []
+    for period in range(1, len(collections)):
+        structuredsecurity.increase_period()
+        structuredsecurity.make_payments(collections[period], principal[period])
+        ss_waterfalls.append(structuredsecurity.get_waterfall(period))
+
+    metrics = [[tranche.IRR(), tranche.DIRR(), tranche.AL()] for tranche in structuredsecurity.tranches]
+    return [ss_waterfalls, metrics]